@@ -0,0 +1,134 @@
+"""
+JSON 编解码微基准
+对比标准库 json 与 src/json_codec 当前后端（orjson/msgspec）在典型 Milky 事件上的耗时：
+WebSocket 帧解码、raw_message 序列化、API 请求体编码与响应解码
+
+用法: python benchmarks/bench_json_codec.py [--number N]
+"""
+
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import timeit
+
+# 直接按文件加载，避免导入 src 包时读取配置文件
+_spec = importlib.util.spec_from_file_location(
+    "json_codec", os.path.join(os.path.dirname(__file__), "..", "src", "json_codec.py")
+)
+json_codec = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(json_codec)
+
+
+def recorded_events() -> dict:
+    """按 Milky 协议构造的典型事件"""
+    group_text = {
+        "time": 1760000000,
+        "self_id": 10001,
+        "event_type": "message_receive",
+        "data": {
+            "message_scene": "group",
+            "peer_id": 123456789,
+            "message_seq": 98765,
+            "sender_id": 20002,
+            "time": 1760000000,
+            "segments": [
+                {"type": "mention", "data": {"user_id": 10001}},
+                {"type": "text", "data": {"text": "今天天气怎么样？顺便帮我看看这张图 " * 4}},
+                {"type": "face", "data": {"face_id": "14"}},
+            ],
+            "group": {"group_id": 123456789, "group_name": "测试群", "member_count": 321, "max_member_count": 500},
+            "group_member": {
+                "user_id": 20002,
+                "nickname": "群友",
+                "card": "群名片",
+                "title": "",
+                "sex": "unknown",
+                "level": 42,
+                "role": "member",
+                "join_time": 1700000000,
+                "last_sent_time": 1760000000,
+            },
+        },
+    }
+    group_image = json.loads(json.dumps(group_text))
+    group_image["data"]["segments"] = [
+        {
+            "type": "image",
+            "data": {
+                "resource_id": "EhQ" + "x" * 120,
+                "temp_url": "https://multimedia.nt.qq.com.cn/download?appid=1407&fileid=" + "y" * 160 + "&rkey=" + "z" * 96,
+                "summary": "[图片]",
+                "sub_type": "normal",
+            },
+        }
+    ]
+    private_voice = {
+        "time": 1760000001,
+        "self_id": 10001,
+        "event_type": "message_receive",
+        "data": {
+            "message_scene": "friend",
+            "peer_id": 20002,
+            "message_seq": 42,
+            "sender_id": 20002,
+            "time": 1760000001,
+            "segments": [
+                {"type": "record", "data": {"file": "base64://" + base64.b64encode(os.urandom(48 * 1024)).decode()}}
+            ],
+            "friend": {"user_id": 20002, "nickname": "好友", "sex": "unknown", "qid": "", "remark": ""},
+        },
+    }
+    notice = {
+        "time": 1760000002,
+        "self_id": 10001,
+        "event_type": "group_nudge",
+        "data": {"group_id": 123456789, "sender_id": 20002, "receiver_id": 10001},
+    }
+    return {"group_text": group_text, "group_image": group_image, "private_voice": private_voice, "notice": notice}
+
+
+def bench(func, number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    return seconds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="每组重复次数")
+    args = parser.parse_args()
+
+    print(f"后端: {json_codec.backend}")
+    print(f"{'事件':<16}{'操作':<22}{'stdlib(us)':>12}{'codec(us)':>12}{'加速':>8}")
+    for name, event in recorded_events().items():
+        frame = json.dumps(event, ensure_ascii=False)
+        frame_bytes = frame.encode("utf-8")
+        api_params = {"group_id": 123456789, "message": event["data"].get("segments", [])}
+        cases = [
+            ("ws 帧解码", lambda: json.loads(frame), lambda: json_codec.loads(frame)),
+            (
+                "raw_message 序列化",
+                lambda: json.dumps({"post_type": "message", "data": event}, ensure_ascii=False),
+                lambda: json_codec.dumps_event("message", frame),
+            ),
+            (
+                "API 请求体编码",
+                lambda: json.dumps(api_params).encode("utf-8"),
+                lambda: json_codec.dumps_bytes(api_params),
+            ),
+            (
+                "API 响应解码",
+                lambda: json.loads(frame_bytes.decode("utf-8")),
+                lambda: json_codec.loads(frame_bytes),
+            ),
+        ]
+        number = max(1, args.number // 20) if name == "private_voice" else args.number
+        for label, baseline, candidate in cases:
+            baseline_us = bench(baseline, number)
+            candidate_us = bench(candidate, number)
+            print(f"{name:<16}{label:<22}{baseline_us:>12.2f}{candidate_us:>12.2f}{baseline_us / candidate_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+热路径日志开销微基准
+模拟一条带图片的群消息在接收、调用 API 时产生的调试日志，对比原先的 f-string 写法与
+延迟格式化 + 脱敏写法在 INFO 级别（调试日志不输出）下每个事件消耗的 CPU 时间，
+并给出 DEBUG 级别下单条日志的长度
+
+用法: python benchmarks/bench_logging.py [--number N]
+"""
+
+import argparse
+import base64
+import importlib.util
+import os
+import timeit
+
+from loguru import logger
+
+# 直接按文件加载，避免导入 src 包时读取配置文件
+_spec = importlib.util.spec_from_file_location(
+    "log_format", os.path.join(os.path.dirname(__file__), "..", "src", "log_format.py")
+)
+log_format = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(log_format)
+redacted = log_format.redacted
+
+
+def build_event() -> dict:
+    image_base64 = base64.b64encode(os.urandom(256 * 1024)).decode()
+    return {
+        "time": 1760000000,
+        "self_id": 10001,
+        "event_type": "message_receive",
+        "data": {
+            "message_scene": "group",
+            "peer_id": 123456789,
+            "message_seq": 98765,
+            "sender_id": 20002,
+            "time": 1760000000,
+            "segments": [
+                {"type": "text", "data": {"text": "看看这张图"}},
+                {
+                    "type": "image",
+                    "data": {
+                        "resource_id": "EhQ" + "x" * 120,
+                        "temp_url": "https://multimedia.nt.qq.com.cn/download?fileid=abc&rkey=" + "z" * 96,
+                        "base64": image_base64,
+                        "sub_type": "normal",
+                    },
+                },
+            ],
+            "group": {"group_id": 123456789, "group_name": "测试群"},
+            "group_member": {"user_id": 20002, "nickname": "群友", "card": "群名片", "role": "member"},
+        },
+    }
+
+
+def eager(event: dict, params: dict, result: dict) -> None:
+    """原先的写法：无论级别如何都会先拼出完整字符串"""
+    logger.debug(f"收到 Milky 事件: {event.get('event_type', 'unknown')}")
+    logger.debug(f"完整的事件数据: {event}")
+    logger.debug(f"处理事件类型: {event['event_type']}")
+    logger.debug(f"事件数据结构: {event}")
+    logger.debug(f"收到原始消息: {event}")
+    for segment in event["data"]["segments"]:
+        logger.debug(f"处理消息段类型: {segment['type']}, 内容: {segment}")
+    logger.debug(f"调用 Milky API: send_group_message, 参数: {params}")
+    logger.debug(f"API 调用成功: send_group_message, 响应: {result}")
+
+
+def lazy(event: dict, params: dict, result: dict) -> None:
+    """现在的写法：参数延迟格式化，只有日志会被输出时才执行脱敏与拼接"""
+    logger.debug("收到 Milky 事件: {}, 事件数据: {}", event["event_type"], redacted(event["data"]))
+    for segment in event["data"]["segments"]:
+        logger.debug("处理消息段类型: {}, 内容: {}", segment["type"], redacted(segment))
+    logger.debug("调用 Milky API: {}, 参数: {}", "send_group_message", redacted(params))
+    logger.debug("API 调用成功: {}, 响应: {}", "send_group_message", redacted(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200, help="重复次数")
+    args = parser.parse_args()
+
+    event = build_event()
+    image_base64 = event["data"]["segments"][1]["data"]["base64"]
+    params = {"group_id": 123456789, "message": [{"type": "image", "data": {"file": f"base64://{image_base64}"}}]}
+    result = {"status": "ok", "retcode": 0, "data": {"message_seq": 98766, "time": 1760000001}}
+
+    logger.remove()
+    logger.add(lambda _: None, level="INFO")
+    eager_us = min(timeit.repeat(lambda: eager(event, params, result), number=args.number, repeat=5)) / args.number * 1e6
+    lazy_us = min(timeit.repeat(lambda: lazy(event, params, result), number=args.number, repeat=5)) / args.number * 1e6
+    print("INFO 级别（调试日志被丢弃）每个事件耗时:")
+    print(f"  f-string: {eager_us:10.2f} us")
+    print(f"  延迟格式化: {lazy_us:8.2f} us  (节省 {eager_us - lazy_us:.2f} us, {eager_us / lazy_us:.0f}x)")
+
+    print("DEBUG 级别下“调用 Milky API”一条日志的长度:")
+    print(f"  原样输出: {len(f'调用 Milky API: send_group_message, 参数: {params}')} 字符")
+    print(f"  脱敏输出: {len('调用 Milky API: send_group_message, 参数: ' + str(redacted(params)))} 字符")
+
+
+if __name__ == "__main__":
+    main()
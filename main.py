@@ -7,39 +7,54 @@ from src.recv_handler.notice_handler import notice_handler
 from src.recv_handler.message_sending import message_send_instance
 from src.send_handler import send_handler
 from src.config import global_config
+from src.config.config_watcher import config_watch_loop
 from src.mmc_com_layer import mmc_start_com, mmc_stop_com, router
 from src.milky_com_layer import milky_start_com, milky_stop_com
 from src.event_handlers import setup_event_handlers
-
-message_queue = asyncio.Queue()
+from src.event_dispatcher import event_dispatcher
+from src.flood_detector import flood_detector
+from src.milky_events import MilkyEvent
+from src.stats import stats_report_loop
+from src.media_downloader import media_downloader
+from src.media_cache import media_cache
+from src.image_pool import image_pool
 
 
 async def message_recv():
     """从 Milky 接收消息"""
     # 设置事件处理器
-    await setup_event_handlers(message_queue)
+    await setup_event_handlers(event_dispatcher)
     logger.info("Milky 事件处理器设置完成")
 
 
+async def process_event(event: MilkyEvent) -> None:
+    post_type = event.post_type
+    if post_type == "message":
+        await message_handler.handle_raw_message(event)
+    elif post_type == "meta_event":
+        await meta_event_handler.handle_meta_event(event)
+    elif post_type == "notice":
+        await notice_handler.handle_notice(event)
+    else:
+        logger.warning(f"未知的post_type: {post_type}")
+
+
 async def message_process():
-    while True:
-        message = await message_queue.get()
-        post_type = message.get("post_type")
-        if post_type == "message":
-            await message_handler.handle_raw_message(message)
-        elif post_type == "meta_event":
-            await meta_event_handler.handle_meta_event(message)
-        elif post_type == "notice":
-            await notice_handler.handle_notice(message)
-        else:
-            logger.warning(f"未知的post_type: {post_type}")
-        message_queue.task_done()
-        await asyncio.sleep(0.05)
+    await event_dispatcher.run(process_event)
 
 
 async def main():
     message_send_instance.maibot_router = router
-    _ = await asyncio.gather(milky_start_com(), message_recv(), mmc_start_com(), message_process())
+    _ = await asyncio.gather(
+        milky_start_com(),
+        message_recv(),
+        mmc_start_com(),
+        message_process(),
+        stats_report_loop(global_config.debug.stats_interval),
+        media_cache.flush_loop(),
+        config_watch_loop(global_config.debug.config_reload_interval),
+        flood_detector.sweep_loop(),
+    )
 
 
 async def graceful_shutdown():
@@ -51,8 +66,12 @@ async def graceful_shutdown():
                 task.cancel()
         await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 15)
         await milky_stop_com()  # 停止 Milky 通信层
+        await media_downloader.close()
+        media_cache.flush()
+        image_pool.shutdown()
         await mmc_stop_com()  # 后置避免神秘exception
         logger.info("Adapter已成功关闭")
+        await logger.complete()
     except Exception as e:
         logger.error(f"Adapter关闭中出现错误: {e}")
 
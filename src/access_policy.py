@@ -0,0 +1,156 @@
+"""
+预编译的聊天访问策略
+黑白名单在加载配置时编译为 frozenset，事件解码后、入队前即完成判定，
+被拦截的事件不会再触发获取用户/群成员信息等 API 调用，拦截数按原因计数而不是逐条输出警告
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from .config import global_config
+from .config.official_configs import ChatConfig
+from .logger import logger
+from .milky_events import (
+    FriendNudgeEvent,
+    GroupMuteEvent,
+    GroupNudgeEvent,
+    GroupWholeMuteEvent,
+    IncomingMessage,
+    MilkyEvent,
+)
+from .stats import register_stats_provider
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    group_whitelist: bool
+    group_ids: FrozenSet[int]
+    private_whitelist: bool
+    private_ids: FrozenSet[int]
+    banned_users: FrozenSet[int]
+    group_banned_users: Dict[int, FrozenSet[int]]
+    """群号 -> 仅在该群内屏蔽的用户"""
+
+    enable_poke: bool
+
+
+def _parse_group_bans(entries: list[str]) -> Dict[int, FrozenSet[int]]:
+    rules: Dict[int, set] = {}
+    for entry in entries:
+        group_id, sep, user_id = str(entry).partition(":")
+        try:
+            if not sep:
+                raise ValueError
+            rules.setdefault(int(group_id), set()).add(int(user_id))
+        except ValueError:
+            logger.warning(f"group_ban_user_id 中的条目 {entry!r} 格式无效，应为 \"群号:QQ号\"，已忽略")
+    return {group_id: frozenset(users) for group_id, users in rules.items()}
+
+
+def compile_policy(chat_config: ChatConfig) -> CompiledPolicy:
+    """将 [chat] 配置编译为便于快速判定的策略"""
+    return CompiledPolicy(
+        group_whitelist=chat_config.group_list_type == "whitelist",
+        group_ids=frozenset(chat_config.group_list),
+        private_whitelist=chat_config.private_list_type == "whitelist",
+        private_ids=frozenset(chat_config.private_list),
+        banned_users=frozenset(chat_config.ban_user_id),
+        group_banned_users=_parse_group_bans(chat_config.group_ban_user_id),
+        enable_poke=chat_config.enable_poke,
+    )
+
+
+def event_subject(event: MilkyEvent) -> Optional[Tuple[Optional[int], int]]:
+    """
+    获取需要做访问判定的事件所涉及的群号与用户
+    Returns:
+        (群号, QQ号) | None: 私聊时群号为 None，不需要判定的事件返回 None
+    """
+    data = event.data
+    match data:
+        case IncomingMessage():
+            return (data.peer_id if data.message_scene == "group" else None), data.sender_id
+        case GroupNudgeEvent():
+            return data.group_id, data.sender_id
+        case FriendNudgeEvent():
+            return None, (event.self_id if data.is_self_send else data.user_id)
+        case GroupMuteEvent():
+            return data.group_id, data.user_id
+        case GroupWholeMuteEvent():
+            return data.group_id, data.operator_id
+    return None
+
+
+class AccessPolicy:
+    def __init__(self, chat_config: ChatConfig):
+        self.policy: CompiledPolicy = compile_policy(chat_config)
+        self.allowed: int = 0
+        self.dropped: Counter = Counter()
+        """拦截原因 -> 次数"""
+
+    def reload(self, chat_config: ChatConfig) -> None:
+        """重新编译策略，判定时只读取一次 self.policy，替换是原子的，计数保留"""
+        self.policy = compile_policy(chat_config)
+
+    def check(self, user_id: int, group_id: Optional[int] = None, ignore_global_list: bool = False) -> Optional[str]:
+        """
+        判定用户/群是否允许聊天
+        Parameters:
+            user_id: int: 用户ID
+            group_id: int: 群ID，私聊时为 None
+            ignore_global_list: bool: 是否忽略全局黑名单
+        Returns:
+            str | None: 拦截原因，允许时为 None
+        """
+        policy = self.policy
+        if group_id:
+            if (group_id in policy.group_ids) != policy.group_whitelist:
+                return "group_not_whitelisted" if policy.group_whitelist else "group_blacklisted"
+            group_bans = policy.group_banned_users.get(group_id)
+            if group_bans and user_id in group_bans:
+                return "group_user_banned"
+        elif (user_id in policy.private_ids) != policy.private_whitelist:
+            return "private_not_whitelisted" if policy.private_whitelist else "private_blacklisted"
+        if not ignore_global_list and user_id in policy.banned_users:
+            return "user_banned"
+        return None
+
+    def admit(self, event: MilkyEvent) -> bool:
+        """
+        入口判定，被拦截的事件按原因计数
+        Returns:
+            bool: 是否放行
+        """
+        subject = event_subject(event)
+        if subject is None:
+            return True
+        if isinstance(event.data, (GroupNudgeEvent, FriendNudgeEvent)) and not self.policy.enable_poke:
+            reason = "poke_disabled"
+        else:
+            group_id, user_id = subject
+            # 禁言通知不受全局黑名单限制，被屏蔽用户的禁言与解除仍需同步给 MaiBot
+            ignore_global_list = isinstance(event.data, (GroupMuteEvent, GroupWholeMuteEvent))
+            reason = self.check(user_id, group_id, ignore_global_list)
+        if reason is None:
+            self.allowed += 1
+            return True
+        self.dropped[reason] += 1
+        logger.debug("事件 {} 被访问策略拦截: {}", event.event_type, reason)
+        return False
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"allowed": self.allowed, **{f"dropped_{reason}": n for reason, n in self.dropped.items()}}
+
+
+access_policy = AccessPolicy(global_config.chat)
+register_stats_provider("access_policy", access_policy.get_stats)
+
+
+def _on_config_reload(old_config, new_config) -> None:
+    if old_config.chat != new_config.chat:
+        access_policy.reload(new_config.chat)
+        logger.info("聊天访问策略已更新")
+
+
+global_config.subscribe(_on_config_reload)
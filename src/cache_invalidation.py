@@ -0,0 +1,95 @@
+"""
+根据 Milky 推送的通知事件失效或修补目录缓存
+群成员变动、管理员变更、禁言、改群名等事件发生时，对应的缓存条目会被立即更新，
+因此可以使用较长的 TTL 而不会返回过期的群名片或身份
+"""
+
+import time
+
+from .directory_cache import directory_cache
+from .logger import logger
+from .milky_com_layer import milky_com
+from .milky_events import (
+    GroupAdminChangeEvent,
+    GroupMemberDecreaseEvent,
+    GroupMemberIncreaseEvent,
+    GroupMuteEvent,
+    GroupNameChangeEvent,
+    MilkyEvent,
+)
+
+
+def _patch_member(group_id: int, user_id: int, **changes) -> None:
+    def updater(data: dict) -> dict:
+        if "member" in data:
+            data["member"] = {**data["member"], **changes}
+        else:
+            data.update(changes)
+        return data
+
+    if directory_cache.patch("member", (group_id, user_id), updater):
+        logger.debug(f"已更新群 {group_id} 成员 {user_id} 的缓存: {changes}")
+
+
+async def on_group_member_change(event: MilkyEvent) -> None:
+    """群成员增加/减少：成员信息与群人数都已变化"""
+    data: GroupMemberIncreaseEvent | GroupMemberDecreaseEvent = event.data
+    if not data.group_id:
+        return
+    if data.user_id and data.user_id == event.self_id:
+        # 机器人自身进出群，整个群的缓存都不再可信
+        directory_cache.invalidate_group(data.group_id)
+        return
+    directory_cache.invalidate("member", (data.group_id, data.user_id))
+    directory_cache.invalidate("group", data.group_id)
+
+
+async def on_group_admin_change(event: MilkyEvent) -> None:
+    data: GroupAdminChangeEvent = event.data
+    if data.group_id and data.user_id:
+        _patch_member(data.group_id, data.user_id, role="admin" if data.is_set else "member")
+
+
+async def on_group_mute(event: MilkyEvent) -> None:
+    data: GroupMuteEvent = event.data
+    if data.group_id and data.user_id:
+        duration = data.duration
+        _patch_member(
+            data.group_id, data.user_id, shut_up_end_time=int(time.time()) + duration if duration > 0 else 0
+        )
+
+
+async def on_group_name_change(event: MilkyEvent) -> None:
+    data: GroupNameChangeEvent = event.data
+    group_id = data.group_id
+    new_group_name = data.new_group_name
+    if not group_id or not new_group_name:
+        return
+
+    def updater(group_data: dict) -> dict:
+        if "group" in group_data:
+            group_data["group"] = {**group_data["group"], "group_name": new_group_name}
+        else:
+            group_data["group_name"] = new_group_name
+        return group_data
+
+    directory_cache.patch("group", group_id, updater)
+
+
+async def on_bot_offline(event: MilkyEvent) -> None:
+    directory_cache.clear()
+
+
+def register_cache_invalidation() -> None:
+    """注册缓存失效监听器"""
+    listeners = {
+        "group_member_increase": on_group_member_change,
+        "group_member_decrease": on_group_member_change,
+        "group_admin_change": on_group_admin_change,
+        "group_mute": on_group_mute,
+        "group_name_change": on_group_name_change,
+        "bot_offline": on_bot_offline,
+    }
+    for event_type, listener in listeners.items():
+        milky_com.add_event_listener(event_type, listener)
+    logger.debug("目录缓存失效监听器注册完成")
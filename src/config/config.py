@@ -1,6 +1,9 @@
+import asyncio
+import inspect
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any, Callable, List
 
 import tomlkit
 import shutil
@@ -12,17 +15,23 @@ from rich.traceback import install
 
 from src.config.config_base import ConfigBase
 from src.config.official_configs import (
+    CacheConfig,
     ChatConfig,
     DebugConfig,
+    FloodConfig,
     MaiBotServerConfig,
+    MediaConfig,
     MilkyServerConfig,
     NicknameConfig,
+    PrefilterConfig,
     VoiceConfig,
+    WorkerConfig,
 )
 
 install(extra_lines=3)
 
 TEMPLATE_DIR = "template"
+CONFIG_PATH = "config.toml"
 
 
 def update_config():
@@ -118,29 +127,92 @@ class Config(ConfigBase):
     chat: ChatConfig
     voice: VoiceConfig
     debug: DebugConfig
+    worker: WorkerConfig = field(default_factory=WorkerConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    media: MediaConfig = field(default_factory=MediaConfig)
+    prefilter: PrefilterConfig = field(default_factory=PrefilterConfig)
+    flood: FloodConfig = field(default_factory=FloodConfig)
 
 
-def load_config(config_path: str) -> Config:
+def parse_config(config_path: str) -> Config:
     """
-    加载配置文件
+    读取并校验配置文件，不做任何日志输出
     :param config_path: 配置文件路径
-    :return: Config对象
+    :return: Config对象，解析或校验失败时抛出异常
     """
-    # 读取配置文件
     with open(config_path, "r", encoding="utf-8") as f:
         config_data = tomlkit.load(f)
+    return Config.from_dict(config_data)
 
-    # 创建Config对象
+
+def load_config(config_path: str) -> Config:
+    """
+    加载配置文件
+    :param config_path: 配置文件路径
+    :return: Config对象
+    """
     try:
-        return Config.from_dict(config_data)
+        return parse_config(config_path)
     except Exception as e:
         logger.critical("配置文件解析失败")
         raise e
 
 
+ConfigListener = Callable[[Config, Config], Any]
+"""配置变更回调，参数为 (旧配置, 新配置)，可以是协程函数"""
+
+
+class ConfigHolder:
+    """
+    全局配置的持有者，属性访问会转发到当前的配置快照
+    重新加载时先完整解析并校验出新的 Config，再通过一次引用赋值整体替换，
+    读取方不会看到新旧混合的配置，也不需要暂停事件处理；快照发布后不再修改
+    """
+
+    __slots__ = ("_snapshot", "_listeners")
+
+    def __init__(self, config: Config):
+        self._snapshot: Config = config
+        self._listeners: List[ConfigListener] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._snapshot, name)
+
+    @property
+    def snapshot(self) -> Config:
+        """当前的配置快照，需要连续读取多个字段且要求一致时使用"""
+        return self._snapshot
+
+    def subscribe(self, listener: ConfigListener) -> None:
+        """注册配置变更回调，只在重新加载成功后调用"""
+        self._listeners.append(listener)
+
+    async def reload(self, config_path: str = CONFIG_PATH) -> bool:
+        """
+        重新加载配置文件，解析或校验失败时保留当前配置
+        Returns:
+            bool: 是否已切换到新配置
+        """
+        try:
+            new_config = await asyncio.to_thread(parse_config, config_path)
+        except Exception as e:
+            logger.error(f"重新加载配置失败，继续使用当前配置: {e}")
+            return False
+        old_config = self._snapshot
+        self._snapshot = new_config
+        for listener in self._listeners:
+            try:
+                result = listener(old_config, new_config)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"执行配置变更回调 {getattr(listener, '__qualname__', listener)} 时发生错误: {e}")
+        return True
+
+
 # 更新配置
 update_config()
 
 logger.info("正在品鉴配置文件...")
-global_config = load_config(config_path="config.toml")
+global_config = ConfigHolder(load_config(config_path=CONFIG_PATH))
 logger.info("非常的新鲜，非常的美味！")
@@ -0,0 +1,78 @@
+"""
+config.toml 热重载
+定期检查配置文件的修改时间与大小，变化后重新解析校验并整体替换全局配置，
+各组件通过 global_config.subscribe 响应自己关心的配置段
+"""
+
+import asyncio
+import os
+from dataclasses import fields
+from typing import List, Optional, Tuple
+
+from ..logger import logger
+from .config import CONFIG_PATH, Config, global_config
+
+RESTART_REQUIRED_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("worker", "worker_count"),
+    ("media", "max_concurrent_downloads"),
+    ("media", "max_downloads_per_host"),
+    ("media", "download_timeout"),
+    ("media", "image_executor"),
+    ("media", "image_workers"),
+    ("media", "spool_dir"),
+    ("debug", "stats_interval"),
+    ("debug", "config_reload_interval"),
+)
+"""启动时即固定、修改后需要重启才能生效的配置项"""
+
+
+def _file_signature(config_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def changed_sections(old_config: Config, new_config: Config) -> List[str]:
+    """比较两份配置，返回发生变化的配置段名称"""
+    return [f.name for f in fields(Config) if getattr(old_config, f.name) != getattr(new_config, f.name)]
+
+
+def _log_changes(old_config: Config, new_config: Config) -> None:
+    sections = changed_sections(old_config, new_config)
+    if not sections:
+        logger.info("配置文件已重新加载，内容没有变化")
+        return
+    logger.info(f"配置文件已重新加载，变化的配置段: {', '.join(sections)}")
+    for section, name in RESTART_REQUIRED_FIELDS:
+        old_value = getattr(getattr(old_config, section), name)
+        new_value = getattr(getattr(new_config, section), name)
+        if old_value != new_value:
+            logger.warning(f"配置项 {section}.{name} 已从 {old_value} 修改为 {new_value}，需要重启后才能生效")
+
+
+async def config_watch_loop(interval: int, config_path: str = CONFIG_PATH) -> None:
+    """
+    监视配置文件并在变化时热重载
+    Parameters:
+        interval: int: 检查间隔（秒），为0时不监视
+        config_path: str: 配置文件路径
+    """
+    if interval <= 0:
+        return
+    global_config.subscribe(_log_changes)
+    last_signature = _file_signature(config_path)
+    while True:
+        await asyncio.sleep(interval)
+        signature = _file_signature(config_path)
+        if signature is None or signature == last_signature:
+            continue
+        # 编辑器保存时可能分多次写入，等到文件不再变化后再解析
+        await asyncio.sleep(min(interval, 1))
+        settled = _file_signature(config_path)
+        if settled != signature:
+            continue
+        last_signature = signature
+        logger.info("检测到配置文件变化，正在重新加载...")
+        await global_config.reload(config_path)
@@ -19,6 +19,9 @@ class NicknameConfig(ConfigBase):
     nickname: str
     """机器人昵称"""
 
+    alias_names: list[str] = field(default_factory=list)
+    """机器人的别名，与昵称一起用于预过滤"""
+
 
 @dataclass
 class MilkyServerConfig(ConfigBase):
@@ -67,6 +70,9 @@ class ChatConfig(ConfigBase):
     ban_user_id: list[int] = field(default_factory=[])
     """被封禁的用户ID列表，封禁后将无法与其进行交互"""
 
+    group_ban_user_id: list[str] = field(default_factory=list)
+    """仅在指定群内屏蔽的用户，格式为 "群号:QQ号" """
+
     ban_qq_bot: bool = False
     """是否屏蔽QQ官方机器人，若为True，则所有QQ官方机器人将无法与MaiMCore进行交互"""
 
@@ -80,7 +86,190 @@ class VoiceConfig(ConfigBase):
     """是否启用TTS功能"""
 
 
+@dataclass
+class WorkerConfig(ConfigBase):
+    worker_count: int = 8
+    """事件处理 worker 数量，同一会话的事件总是由同一个 worker 按顺序处理"""
+
+    segment_concurrency: int = 4
+    """单条消息内同时处理（下载图片等）的消息段数量上限，小于1时按1处理"""
+
+    queue_capacity: int = 2000
+    """排队事件总数上限，超出时优先丢弃最早的普通群消息，为0时不限制"""
+
+    per_chat_capacity: int = 200
+    """单个群/私聊排队事件数上限，超出时丢弃该会话最早的普通群消息，为0时不限制"""
+
+    interactive_weight: int = 6
+    """私聊、@机器人消息通道的调度权重"""
+
+    notice_weight: int = 3
+    """通知事件通道的调度权重"""
+
+    ambient_weight: int = 1
+    """普通群消息通道的调度权重"""
+
+
+@dataclass
+class CacheConfig(ConfigBase):
+    max_entries: int = 4096
+    """群成员/用户资料/群信息缓存的最大条目数"""
+
+    member_ttl: int = 1800
+    """群成员信息缓存时间（秒），成员变动等事件会主动失效缓存"""
+
+    profile_ttl: int = 600
+    """用户资料缓存时间（秒）"""
+
+    group_ttl: int = 3600
+    """群信息缓存时间（秒），改群名、成员增减等事件会主动更新缓存"""
+
+    negative_ttl: int = 30
+    """查询失败结果的缓存时间（秒），为0时不缓存失败结果"""
+
+
+@dataclass
+class MediaConfig(ConfigBase):
+    download_timeout: int = 10
+    """单个媒体文件的下载超时时间（秒）"""
+
+    max_download_mb: int = 20
+    """单个媒体文件的大小上限（MB），超出时中止下载"""
+
+    max_concurrent_downloads: int = 16
+    """全局同时下载的最大数量"""
+
+    max_downloads_per_host: int = 4
+    """对同一主机同时下载的最大数量"""
+
+    cache_enabled: bool = True
+    """是否启用入站图片/表情包的磁盘缓存"""
+
+    cache_max_mb: int = 512
+    """磁盘缓存的总大小上限（MB），超出时淘汰最久未使用的文件"""
+
+    image_executor: Literal["process", "thread"] = "process"
+    """图片解码/转码使用的执行器类型，进程池或线程池"""
+
+    image_workers: int = 2
+    """图片处理执行器的 worker 数量"""
+
+    image_job_timeout: int = 10
+    """单个图片处理任务的时间上限（秒）"""
+
+    gif_cache_max_mb: int = 64
+    """出站表情GIF转换结果的内存缓存上限（MB）"""
+
+    gif_cache_spill: bool = False
+    """内存缓存满时是否将转换结果溢出到磁盘（data/gif_cache）"""
+
+    gif_cache_disk_max_mb: int = 256
+    """GIF转换结果磁盘缓存上限（MB）"""
+
+    downscale_enabled: bool = False
+    """是否在转发给MaiBot前缩小入站图片（表情包和动图不处理）"""
+
+    downscale_max_dimension: int = 2048
+    """图片长边的最大像素数"""
+
+    downscale_max_kb: int = 1024
+    """图片大小上限（KB），超出时即使尺寸未超限也会重新编码，并逐步降低质量、缩小尺寸直到不超过上限"""
+
+    downscale_format: Literal["jpeg", "webp", "png"] = "jpeg"
+    """重新编码的目标格式"""
+
+    downscale_quality: int = 85
+    """重新编码的质量（1-100，仅对有损格式有效）"""
+
+    image_url_mode: Literal["base64", "url"] = "base64"
+    """入站图片的转发方式，url 模式下只转发图片链接，由MaiBot自行下载（表情包仍使用Base64）"""
+
+    image_url_groups: list[int] = field(default_factory=list)
+    """即使 image_url_mode 为 base64 也使用链接转发图片的群"""
+
+    image_url_min_ttl: int = 60
+    """链接剩余有效期低于该值（秒）时回退为Base64"""
+
+    spool_enabled: bool = False
+    """是否将较大的出站图片/语音写入中转目录并以 file:// URI 发送（需要 Milky 能访问该目录）"""
+
+    spool_dir: str = "data/spool"
+    """中转目录（适配器侧路径），启动时会清理其中残留的中转文件（其他文件不受影响）"""
+
+    spool_uri_dir: str = ""
+    """Milky 侧看到的中转目录路径，为空时与 spool_dir 的绝对路径相同（用于容器挂载等路径不一致的情况）"""
+
+    spool_threshold_kb: int = 256
+    """媒体大小达到该值（KB）时才使用中转目录，较小的媒体仍内联Base64"""
+
+    memory_budget_mb: int = 256
+    """同时驻留在内存中的媒体总量上限（MB），超出时推迟新的图片下载，出站媒体改用中转目录或等待，为0时不限制"""
+
+    memory_wait_timeout: int = 10
+    """等待媒体内存预算的最长时间（秒），超时后仍继续处理"""
+
+
+@dataclass
+class PrefilterConfig(ConfigBase):
+    enable: bool = False
+    """是否启用昵称/关键词预过滤，只作用于未 @ 机器人的群消息"""
+
+    keywords: list[str] = field(default_factory=list)
+    """额外的关键词，与昵称、别名一起匹配，不区分大小写"""
+
+    policy: Literal["pass", "sample", "drop"] = "pass"
+    """未命中的消息的默认处理方式：放行/采样/丢弃"""
+
+    group_policy: list[str] = field(default_factory=list)
+    """按群指定处理方式，格式为 "群号:pass/sample/drop" """
+
+    sample_every: int = 10
+    """采样时每个群每多少条未命中的消息放行一条，为0或负数时全部放行"""
+
+
+@dataclass
+class FloodConfig(ConfigBase):
+    enable: bool = False
+    """是否折叠群内的复读/刷屏消息，@机器人和命中预过滤关键词的消息不折叠"""
+
+    window: int = 30
+    """滑动窗口长度（秒），同一内容距上次出现超过该时间视为新的一轮"""
+
+    threshold: int = 3
+    """同一内容在窗口内出现超过该次数后，后续的重复消息会被折叠"""
+
+    exempt_user_id: list[int] = field(default_factory=list)
+    """不做折叠的用户"""
+
+
 @dataclass
 class DebugConfig(ConfigBase):
     level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
     """日志级别，默认为INFO"""
+
+    stats_interval: int = 300
+    """运行指标输出间隔（秒），为0时不输出"""
+
+    config_reload_interval: int = 2
+    """检查 config.toml 是否被修改的间隔（秒），修改后自动重新加载，为0时不检查"""
+
+    log_format: Literal["text", "json"] = "text"
+    """日志格式，json 为每行一条 JSON（含 event_type、group_id、latency_ms 等固定字段）"""
+
+    log_file: str = ""
+    """日志文件路径，为空时只输出到终端"""
+
+    log_file_max_mb: int = 10
+    """单个日志文件的大小上限（MB），超出后轮转"""
+
+    log_file_retention: int = 5
+    """保留的历史日志文件数"""
+
+    log_rate_limit_window: int = 10
+    """日志限流窗口（秒）"""
+
+    log_rate_limit_burst: int = 20
+    """同一位置的日志在一个窗口内最多输出的条数（ERROR 及以上不限），为0时不限流"""
+
+    log_sample_every: int = 100
+    """超出限流后每多少条采样输出一条，为0时全部抑制"""
@@ -0,0 +1,138 @@
+"""
+群成员、用户资料、群信息的进程内缓存
+LRU 限制总条目数，每种数据有独立的 TTL，查询失败的结果也会短暂缓存，避免反复请求
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .config import global_config
+from .stats import register_stats_provider
+
+CACHE_KINDS = ("member", "profile", "group")
+
+
+def is_ok_result(result: Optional[dict]) -> bool:
+    """判断 Milky API 返回值是否成功"""
+    return bool(result) and result.get("status") == "ok"
+
+
+class DirectoryCache:
+    def __init__(self):
+        # (kind, key) -> (过期时间, API 返回值)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, dict]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {
+            kind: {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0} for kind in CACHE_KINDS
+        }
+
+    def _ttl(self, kind: str, ok: bool) -> int:
+        cache_config = global_config.cache
+        if not ok:
+            return cache_config.negative_ttl
+        return {
+            "member": cache_config.member_ttl,
+            "profile": cache_config.profile_ttl,
+            "group": cache_config.group_ttl,
+        }[kind]
+
+    def get(self, kind: str, key: Hashable) -> Optional[dict]:
+        """获取未过期的缓存值，不存在时返回 None"""
+        entry = self._entries.get((kind, key))
+        if entry is None:
+            return None
+        expire_at, result = entry
+        if expire_at <= time.monotonic():
+            del self._entries[(kind, key)]
+            return None
+        self._entries.move_to_end((kind, key))
+        return result
+
+    def put(self, kind: str, key: Hashable, result: Optional[dict]) -> None:
+        """写入缓存，失败的结果使用 negative_ttl"""
+        ttl = self._ttl(kind, is_ok_result(result))
+        if ttl <= 0:
+            return
+        if result is None:
+            result = {"status": "failed", "retcode": -1, "message": "empty response"}
+        self._entries[(kind, key)] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end((kind, key))
+        while len(self._entries) > global_config.cache.max_entries:
+            (evicted_kind, _), _ = self._entries.popitem(last=False)
+            self._stats[evicted_kind]["evictions"] += 1
+
+    def invalidate(self, kind: str, key: Hashable) -> None:
+        """移除一条缓存"""
+        self._entries.pop((kind, key), None)
+
+    def invalidate_group(self, group_id: int) -> None:
+        """移除某个群的群信息及其全部成员信息"""
+        self._entries.pop(("group", group_id), None)
+        for kind, key in list(self._entries.keys()):
+            if kind == "member" and key[0] == group_id:
+                del self._entries[(kind, key)]
+
+    def patch(self, kind: str, key: Hashable, updater: Callable[[dict], dict]) -> bool:
+        """
+        原地更新一条成功的缓存，保留剩余的 TTL
+        Parameters:
+            kind: str: 数据类型
+            key: Hashable: 缓存键
+            updater: Callable[[dict], dict]: 接收旧的 data 字段，返回新的 data 字段
+        Returns:
+            bool: 是否存在可更新的缓存
+        """
+        entry = self._entries.get((kind, key))
+        if entry is None or not is_ok_result(entry[1]):
+            return False
+        expire_at, result = entry
+        # 复制一份，避免修改已经交给调用方的返回值
+        self._entries[(kind, key)] = (expire_at, {**result, "data": updater(dict(result.get("data") or {}))})
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_fetch(self, kind: str, key: Hashable, fetcher: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        优先从缓存获取，未命中时调用 fetcher 并写入缓存
+        Parameters:
+            kind: str: 数据类型，member/profile/group
+            key: Hashable: 缓存键
+            fetcher: Callable[[], Awaitable[dict]]: 未命中时调用的 API
+        Returns:
+            dict: API 返回值（可能是缓存的失败结果）
+        """
+        cached = self.get(kind, key)
+        if cached is not None:
+            if is_ok_result(cached):
+                self._stats[kind]["hits"] += 1
+            else:
+                self._stats[kind]["negative_hits"] += 1
+            return cached
+        self._stats[kind]["misses"] += 1
+        result = await fetcher()
+        self.put(kind, key, result)
+        return result
+
+    def prime_member(self, group_id: int, member: dict) -> None:
+        """用事件中携带的群成员信息预热缓存"""
+        if group_id and member and member.get("user_id"):
+            self.put("member", (group_id, member["user_id"]), {"status": "ok", "retcode": 0, "data": {"member": member}})
+
+    def prime_group(self, group: dict) -> None:
+        """用事件中携带的群信息预热缓存"""
+        if group and group.get("group_id"):
+            self.put("group", group["group_id"], {"status": "ok", "retcode": 0, "data": {"group": group}})
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"entries": len(self._entries)}
+        for kind, kind_stats in self._stats.items():
+            lookups = kind_stats["hits"] + kind_stats["negative_hits"] + kind_stats["misses"]
+            hit_rate = (kind_stats["hits"] + kind_stats["negative_hits"]) / lookups if lookups else 0.0
+            stats[kind] = {**kind_stats, "hit_rate": round(hit_rate, 3)}
+        return stats
+
+
+directory_cache = DirectoryCache()
+register_stats_provider("directory_cache", directory_cache.get_stats)
@@ -0,0 +1,368 @@
+"""
+按会话分片的事件分发器
+同一会话（群/私聊）的事件总是进入同一个分片，保证会话内顺序；不同分片由独立的 worker 并行处理
+队列有总容量与单会话容量上限，积压时只丢弃未 @ 机器人的普通群消息，并统计丢弃原因与最高水位
+分片内按优先级通道在会话之间加权公平调度，私聊与 @机器人 的会话不会排在大量普通群消息之后，
+会话内仍严格按到达顺序处理
+"""
+
+import asyncio
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .config import global_config
+from .logger import logger
+from .milky_events import FriendNudgeEvent, GroupNudgeEvent, IncomingMessage, MessageRecallEvent, MilkyEvent
+from .stats import Histogram, register_stats_provider
+
+
+def get_conversation_key(event: MilkyEvent) -> Tuple[str, Any]:
+    """
+    计算事件所属的会话键
+    Parameters:
+        event: MilkyEvent: 入队的事件
+    Returns:
+        Tuple[str, Any]: 会话键，群相关事件为 ("group", 群号)，私聊相关事件为 ("friend", QQ号)
+    """
+    data = event.data
+    if isinstance(data, IncomingMessage):
+        if data.message_scene == "group":
+            return "group", data.peer_id
+        return "friend", data.peer_id or data.sender_id
+    if isinstance(data, MessageRecallEvent):
+        return ("group" if data.message_scene == "group" else "friend"), data.peer_id
+    group_id = getattr(data, "group_id", 0)
+    if group_id:
+        return "group", group_id
+    user_id = getattr(data, "user_id", 0) or getattr(data, "initiator_id", 0) or getattr(data, "sender_id", 0)
+    if user_id:
+        return "friend", user_id
+    return "meta", event.event_type
+
+
+LANE_INTERACTIVE = 0
+"""私聊、@机器人或提到机器人昵称/关键词的群消息、戳机器人"""
+
+LANE_NOTICE = 1
+"""禁言、成员变动等通知与元事件"""
+
+LANE_AMBIENT = 2
+"""未 @ 机器人的普通群消息"""
+
+LANE_NAMES: Tuple[str, ...] = ("interactive", "notice", "ambient")
+
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def classify_lane(event: MilkyEvent) -> int:
+    """
+    入口处根据消息场景、是否 @ 机器人和通知类型确定事件的优先级通道
+    Parameters:
+        event: MilkyEvent: 入队的事件
+    Returns:
+        int: LANE_INTERACTIVE / LANE_NOTICE / LANE_AMBIENT
+    """
+    data = event.data
+    if isinstance(data, IncomingMessage):
+        if data.message_scene != "group" or event.matched_keyword or data.mentions(event.self_id):
+            return LANE_INTERACTIVE
+        return LANE_AMBIENT
+    if isinstance(data, FriendNudgeEvent) or (isinstance(data, GroupNudgeEvent) and data.receiver_id == event.self_id):
+        return LANE_INTERACTIVE
+    return LANE_NOTICE
+
+
+def is_ambient(event: MilkyEvent) -> bool:
+    """
+    是否为可丢弃的普通群消息
+    私聊、@机器人、命中预过滤关键词的消息以及各类通知（禁言、成员变动等）都不可丢弃
+    """
+    return classify_lane(event) == LANE_AMBIENT
+
+
+class _Entry:
+    __slots__ = ("seq", "event", "key", "lane", "dropped")
+
+    def __init__(self, seq: int, event: MilkyEvent, key: Tuple[str, Any], lane: int):
+        self.seq: int = seq
+        self.event: MilkyEvent = event
+        self.key: Tuple[str, Any] = key
+        self.lane: int = lane
+        self.dropped: bool = False
+
+
+def _lane_weights() -> Tuple[int, int, int]:
+    worker_config = global_config.worker
+    return (
+        max(1, worker_config.interactive_weight),
+        max(1, worker_config.notice_weight),
+        max(1, worker_config.ambient_weight),
+    )
+
+
+class _Conversation:
+    """分片内单个会话的 FIFO 队列"""
+
+    __slots__ = ("key", "entries", "lane_counts", "lane", "generation")
+
+    def __init__(self, key: Tuple[str, Any]):
+        self.key: Tuple[str, Any] = key
+        self.entries: Deque[_Entry] = deque()
+        self.lane_counts: List[int] = [0] * len(LANE_NAMES)
+        """各通道排队中的条目数"""
+        self.lane: Optional[int] = None
+        """当前所在的就绪通道，没有排队条目时为 None"""
+        self.generation: int = 0
+        """每次进入就绪通道时递增，用于识别就绪队列中过期的引用"""
+
+    def best_lane(self) -> Optional[int]:
+        for lane, count in enumerate(self.lane_counts):
+            if count:
+                return lane
+        return None
+
+
+class _Shard:
+    """
+    单个 worker 的队列
+    每个会话的事件保持 FIFO，优先级只决定下一次服务哪个会话：会话按其排队条目中最高的优先级进入对应通道的就绪队列，
+    出队时对非空通道做平滑加权轮询（所有非空通道按权重累加积分，取积分最高者并扣除总权重），
+    再取该通道就绪队列队首会话的最早一条事件，之后会话按剩余条目重新排到对应通道队尾。
+    因此同一会话内撤回、禁言等通知不会越过它之前的消息，高权重通道优先但任何非空通道都不会饿死
+    被丢弃的条目只做标记，出队时跳过
+    """
+
+    def __init__(self):
+        self.conversations: Dict[Tuple[str, Any], _Conversation] = {}
+        self.ready_lanes: Tuple[Deque[Tuple[_Conversation, int]], ...] = tuple(deque() for _ in LANE_NAMES)
+        """通道 -> 就绪会话（会话, 入队时的 generation），过期引用出队时跳过"""
+        self.ready_counts: List[int] = [0] * len(LANE_NAMES)
+        """各通道中就绪的会话数"""
+        self.lane_sizes: List[int] = [0] * len(LANE_NAMES)
+        """各通道排队中的条目数"""
+        self._credits: List[int] = [0] * len(LANE_NAMES)
+        self.size: int = 0
+        self.ready: asyncio.Event = asyncio.Event()
+
+    def _reschedule(self, conversation: _Conversation) -> None:
+        """按会话当前最高优先级的排队条目调整其所在的就绪通道"""
+        lane = conversation.best_lane()
+        if lane is None:
+            del self.conversations[conversation.key]
+        if lane == conversation.lane:
+            return
+        if conversation.lane is not None:
+            self.ready_counts[conversation.lane] -= 1
+        conversation.lane = lane
+        if lane is None:
+            return
+        conversation.generation += 1
+        self.ready_counts[lane] += 1
+        self.ready_lanes[lane].append((conversation, conversation.generation))
+
+    def push(self, entry: _Entry) -> None:
+        conversation = self.conversations.get(entry.key)
+        if conversation is None:
+            conversation = self.conversations[entry.key] = _Conversation(entry.key)
+        conversation.entries.append(entry)
+        conversation.lane_counts[entry.lane] += 1
+        self.lane_sizes[entry.lane] += 1
+        self.size += 1
+        self._reschedule(conversation)
+        self.ready.set()
+
+    def discard(self, entry: _Entry) -> None:
+        entry.dropped = True
+        conversation = self.conversations[entry.key]
+        conversation.lane_counts[entry.lane] -= 1
+        self.lane_sizes[entry.lane] -= 1
+        self.size -= 1
+        self._reschedule(conversation)
+
+    def _pick_lane(self) -> int:
+        weights = _lane_weights()
+        best = -1
+        total = 0
+        for lane, count in enumerate(self.ready_counts):
+            if not count:
+                continue
+            self._credits[lane] += weights[lane]
+            total += weights[lane]
+            if best < 0 or self._credits[lane] > self._credits[best]:
+                best = lane
+        self._credits[best] -= total
+        return best
+
+    async def pop(self) -> _Entry:
+        while not self.size:
+            self.ready.clear()
+            await self.ready.wait()
+        lane = self._pick_lane()
+        ready_lane = self.ready_lanes[lane]
+        while True:
+            conversation, generation = ready_lane.popleft()
+            if conversation.lane == lane and conversation.generation == generation:
+                break
+        self.ready_counts[lane] -= 1
+        conversation.lane = None
+        entry = conversation.entries.popleft()
+        while entry.dropped:
+            entry = conversation.entries.popleft()
+        conversation.lane_counts[entry.lane] -= 1
+        self.lane_sizes[entry.lane] -= 1
+        self.size -= 1
+        self._reschedule(conversation)
+        return entry
+
+
+class EventDispatcher:
+    """会话分片 worker 池，排队事件总数与单会话排队数都有上限，分片内按优先级通道选择下一个服务的会话"""
+
+    def __init__(self, worker_count: int):
+        self.worker_count: int = max(1, worker_count)
+        self.shards: List[_Shard] = [_Shard() for _ in range(self.worker_count)]
+        self.peak_depth: List[int] = [0] * self.worker_count
+        self.processed: List[int] = [0] * self.worker_count
+        self.handler: Optional[Callable[[MilkyEvent], Awaitable[None]]] = None
+        self._seq: int = 0
+        self._queued: int = 0
+        self._chat_depth: Counter = Counter()
+        """会话键 -> 排队中的事件数"""
+        self._ambient: "OrderedDict[int, _Entry]" = OrderedDict()
+        """排队中的普通群消息，按入队顺序"""
+        self._chat_ambient: Dict[Tuple[str, Any], "OrderedDict[int, _Entry]"] = {}
+        """会话键 -> 该会话排队中的普通群消息，按入队顺序"""
+        self.high_water_mark: int = 0
+        self.dropped: Counter = Counter()
+        """丢弃原因 -> 次数"""
+        self.lane_wait: List[Histogram] = [Histogram(LATENCY_BUCKETS_MS) for _ in LANE_NAMES]
+        """各通道从收到事件到开始处理的等待时间（毫秒）"""
+        self.lane_latency: List[Histogram] = [Histogram(LATENCY_BUCKETS_MS) for _ in LANE_NAMES]
+        """各通道从收到事件到处理完成的总耗时（毫秒）"""
+
+    def _shard_index(self, key: Tuple[str, Any]) -> int:
+        return hash(key) % self.worker_count
+
+    def _forget_ambient(self, entry: _Entry) -> None:
+        if self._ambient.pop(entry.seq, None) is None:
+            return
+        chat_ambient = self._chat_ambient[entry.key]
+        del chat_ambient[entry.seq]
+        if not chat_ambient:
+            del self._chat_ambient[entry.key]
+
+    def _dequeued(self, entry: _Entry) -> None:
+        self._queued -= 1
+        self._chat_depth[entry.key] -= 1
+        if not self._chat_depth[entry.key]:
+            del self._chat_depth[entry.key]
+        self._forget_ambient(entry)
+
+    def _shed(self, entry: _Entry, reason: str) -> None:
+        """丢弃一条排队中的普通群消息"""
+        self.shards[self._shard_index(entry.key)].discard(entry)
+        self._dequeued(entry)
+        self._record_drop(entry.key, reason)
+
+    def _record_drop(self, key: Tuple[str, Any], reason: str) -> None:
+        self.dropped[reason] += 1
+        logger.warning("事件队列积压，丢弃 {} {} 的一条普通群消息: {}", key[0], key[1], reason)
+
+    async def put(self, event: MilkyEvent) -> None:
+        """
+        将事件放入对应会话的分片，超出容量时按以下顺序处理：
+        先丢弃同一会话/全局最早的普通群消息；没有可丢弃的排队消息时，新的普通群消息直接丢弃，
+        不可丢弃的事件总是入队
+        """
+        worker_config = global_config.worker
+        key = get_conversation_key(event)
+        lane = classify_lane(event)
+        ambient = lane == LANE_AMBIENT
+
+        per_chat_capacity = worker_config.per_chat_capacity
+        if per_chat_capacity > 0 and self._chat_depth[key] >= per_chat_capacity:
+            chat_ambient = self._chat_ambient.get(key)
+            if chat_ambient:
+                self._shed(next(iter(chat_ambient.values())), "chat_full")
+            elif ambient:
+                self._record_drop(key, "chat_full")
+                return
+
+        capacity = worker_config.queue_capacity
+        if capacity > 0 and self._queued >= capacity:
+            if self._ambient:
+                self._shed(next(iter(self._ambient.values())), "queue_full")
+            elif ambient:
+                self._record_drop(key, "queue_full")
+                return
+
+        self._seq += 1
+        entry = _Entry(self._seq, event, key, lane)
+        if ambient:
+            self._ambient[entry.seq] = entry
+            self._chat_ambient.setdefault(key, OrderedDict())[entry.seq] = entry
+        self._queued += 1
+        self._chat_depth[key] += 1
+        if self._queued > self.high_water_mark:
+            self.high_water_mark = self._queued
+
+        index = self._shard_index(key)
+        shard = self.shards[index]
+        shard.push(entry)
+        if shard.size > self.peak_depth[index]:
+            self.peak_depth[index] = shard.size
+
+    async def _worker(self, index: int) -> None:
+        shard = self.shards[index]
+        while True:
+            entry = await shard.pop()
+            self._dequeued(entry)
+            event = entry.event
+            if event.received_at:
+                self.lane_wait[entry.lane].observe((time.monotonic() - event.received_at) * 1000)
+            kind, conversation_id = entry.key
+            try:
+                # 处理过程中的日志都带上事件上下文，供结构化日志使用
+                with logger.contextualize(
+                    event_type=event.event_type,
+                    group_id=conversation_id if kind == "group" else None,
+                    received_at=event.received_at,
+                ):
+                    await self.handler(event)
+            except Exception as e:
+                logger.error(f"分片 {index} 处理事件时发生错误: {e}")
+            finally:
+                self.processed[index] += 1
+                if event.received_at:
+                    self.lane_latency[entry.lane].observe((time.monotonic() - event.received_at) * 1000)
+
+    async def run(self, handler: Callable[[MilkyEvent], Awaitable[None]]) -> None:
+        """启动所有 worker，直到被取消"""
+        self.handler = handler
+        logger.info(f"事件分发器已启动，worker 数量: {self.worker_count}")
+        await asyncio.gather(*(self._worker(i) for i in range(self.worker_count)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各分片的队列深度、丢弃数等指标"""
+        return {
+            "total_depth": self._queued,
+            "high_water_mark": self.high_water_mark,
+            "ambient_depth": len(self._ambient),
+            "depth": [shard.size for shard in self.shards],
+            "peak_depth": list(self.peak_depth),
+            "processed": list(self.processed),
+            "lanes": {
+                name: {
+                    "depth": sum(shard.lane_sizes[lane] for shard in self.shards),
+                    "wait_ms": self.lane_wait[lane].snapshot(),
+                    "latency_ms": self.lane_latency[lane].snapshot(),
+                }
+                for lane, name in enumerate(LANE_NAMES)
+            },
+            **{f"dropped_{reason}": n for reason, n in self.dropped.items()},
+        }
+
+
+event_dispatcher = EventDispatcher(global_config.worker.worker_count)
+register_stats_provider("event_dispatcher", event_dispatcher.get_stats)
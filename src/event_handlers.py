@@ -3,10 +3,31 @@ Milky 事件处理器模块
 包含所有事件类型的处理逻辑
 """
 
-import asyncio
-from typing import Dict, Any
 from .logger import logger
+from .access_policy import access_policy
+from .keyword_filter import keyword_prefilter
+from .flood_detector import flood_detector
 from .milky_com_layer import milky_com
+from .milky_events import MilkyEvent
+from .cache_invalidation import register_cache_invalidation
+
+# 需要进入分发队列处理的事件类型
+QUEUED_EVENT_TYPES = (
+    "message_receive",
+    "message_recall",
+    "friend_request",
+    "group_join_request",
+    "group_invited_join_request",
+    "group_invitation",
+    "friend_nudge",
+    "group_nudge",
+    "group_member_increase",
+    "group_member_decrease",
+    "group_admin_change",
+    "group_mute",
+    "group_whole_mute",
+    "bot_offline",
+)
 
 
 class EventHandlers:
@@ -16,142 +37,21 @@ class EventHandlers:
         self.message_queue = None
         
     def set_message_queue(self, message_queue):
-        """设置消息队列"""
+        """设置消息队列（按会话分片的事件分发器）"""
         self.message_queue = message_queue
         
-    async def handle_message_event(self, event_data: dict):
-        """处理消息接收事件"""
+    async def handle_event(self, event: MilkyEvent):
+        """将解码后的事件放入分发队列，消息、通知、元事件的区分由 MilkyEvent.post_type 给出"""
+        # 在获取用户信息等网络请求之前完成黑白名单判定
+        if not access_policy.admit(event) or not keyword_prefilter.admit(event) or not flood_detector.admit(event):
+            return
         if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "message",
-                "data": event_data
-            })
-
-    async def handle_recall_event(self, event_data: dict):
-        """处理消息撤回事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_friend_request_event(self, event_data: dict):
-        """处理好友请求事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_join_request_event(self, event_data: dict):
-        """处理入群请求事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_invited_join_request_event(self, event_data: dict):
-        """处理群成员邀请他人入群请求事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_invitation_event(self, event_data: dict):
-        """处理他人邀请自身入群事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_friend_nudge_event(self, event_data: dict):
-        """处理好友戳一戳事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_nudge_event(self, event_data: dict):
-        """处理群戳一戳事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_member_increase_event(self, event_data: dict):
-        """处理群成员增加事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_member_decrease_event(self, event_data: dict):
-        """处理群成员减少事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_admin_change_event(self, event_data: dict):
-        """处理群管理员变更事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_mute_event(self, event_data: dict):
-        """处理群禁言事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_group_whole_mute_event(self, event_data: dict):
-        """处理群全体禁言事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "notice",
-                "data": event_data
-            })
-
-    async def handle_bot_offline_event(self, event_data: dict):
-        """处理机器人离线事件"""
-        if self.message_queue:
-            await self.message_queue.put({
-                "post_type": "meta_event",
-                "data": event_data
-            })
+            await self.message_queue.put(event)
 
     def register_all_handlers(self):
         """注册所有事件处理器"""
-        handlers = {
-            "message_receive": self.handle_message_event,
-            "message_recall": self.handle_recall_event,
-            "friend_request": self.handle_friend_request_event,
-            "group_join_request": self.handle_group_join_request_event,
-            "group_invited_join_request": self.handle_group_invited_join_request_event,
-            "group_invitation": self.handle_group_invitation_event,
-            "friend_nudge": self.handle_friend_nudge_event,
-            "group_nudge": self.handle_group_nudge_event,
-            "group_member_increase": self.handle_group_member_increase_event,
-            "group_member_decrease": self.handle_group_member_decrease_event,
-            "group_admin_change": self.handle_group_admin_change_event,
-            "group_mute": self.handle_group_mute_event,
-            "group_whole_mute": self.handle_group_whole_mute_event,
-            "bot_offline": self.handle_bot_offline_event,
-        }
-        
-        for event_type, handler in handlers.items():
-            milky_com.register_event_handler(event_type, handler)
+        for event_type in QUEUED_EVENT_TYPES:
+            milky_com.register_event_handler(event_type, self.handle_event)
             logger.debug(f"注册事件处理器: {event_type}")
             
         logger.info("所有 Milky 事件处理器注册完成")
@@ -164,4 +64,6 @@ event_handlers = EventHandlers()
 async def setup_event_handlers(message_queue):
     """设置事件处理器"""
     event_handlers.set_message_queue(message_queue)
+    flood_detector.set_sink(message_queue.put)
     event_handlers.register_all_handlers()
+    register_cache_invalidation()
@@ -0,0 +1,166 @@
+"""
+群内复读/刷屏折叠
+按群维护滑动窗口内的消息内容指纹（文本归一化后的内容、图片的稳定标识、表情 ID 等），
+同一内容在窗口内出现超过阈值后，后续重复消息不再逐条转发，而是在重复结束或每个窗口结束时
+合并为一条带重复次数的消息送入分发队列，省去逐条的用户信息获取、图片下载与转发
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from .config import global_config
+from .logger import logger
+from .media_cache import image_identifier
+from .milky_events import IncomingMessage, MilkyEvent
+from .stats import register_stats_provider
+
+MAX_RUNS_PER_GROUP = 256
+"""每个群同时跟踪的不同内容数上限"""
+
+
+def _normalize_text(text: str) -> str:
+    """忽略大小写、空白与标点，使只差标点或空格的消息视为相同"""
+    normalized = "".join(char for char in text.casefold() if char.isalnum())
+    return normalized or text.strip()
+
+
+def content_fingerprint(message: IncomingMessage) -> Optional[int]:
+    """
+    计算消息内容的指纹，回复目标不参与计算
+    Returns:
+        int | None: 指纹，没有可比较内容时为 None
+    """
+    parts: List[Any] = []
+    for segment in message.segments:
+        segment_type = segment.get("type")
+        data = segment.get("data") or {}
+        if segment_type == "text":
+            text = _normalize_text(data.get("text", ""))
+            if text:
+                parts.append(text)
+        elif segment_type == "image":
+            parts.append(image_identifier(data) or "image")
+        elif segment_type == "face":
+            parts.append(f"face:{data.get('face_id')}")
+        elif segment_type in ("mention", "at"):
+            parts.append(f"@{data.get('user_id') or data.get('qq')}")
+        elif segment_type != "reply":
+            parts.append(segment_type)
+    return hash(tuple(parts)) if parts else None
+
+
+class _Run:
+    __slots__ = ("count", "last_at", "folded", "fold_started", "last_event")
+
+    def __init__(self, now: float):
+        self.count: int = 0
+        """窗口内出现的次数"""
+        self.last_at: float = now
+        self.folded: int = 0
+        """已折叠、尚未汇总发出的条数"""
+        self.fold_started: float = now
+        self.last_event: Optional[MilkyEvent] = None
+
+
+class FloodDetector:
+    def __init__(self):
+        self._groups: Dict[int, "OrderedDict[int, _Run]"] = {}
+        """群号 -> 指纹 -> 重复情况，按最近出现排序"""
+        self.sink: Optional[Callable[[MilkyEvent], Awaitable[None]]] = None
+        self.stats: Dict[str, int] = {"folded": 0, "summaries": 0}
+        self._pending: Set[asyncio.Task] = set()
+
+    def set_sink(self, sink: Callable[[MilkyEvent], Awaitable[None]]) -> None:
+        """设置汇总消息的去向（分发队列）"""
+        self.sink = sink
+
+    def admit(self, event: MilkyEvent) -> bool:
+        """
+        记录群消息并判断是否需要折叠
+        Returns:
+            bool: 是否放行，被折叠的消息返回 False
+        """
+        flood_config = global_config.flood
+        message = event.data
+        if (
+            not flood_config.enable
+            or not isinstance(message, IncomingMessage)
+            or message.message_scene != "group"
+            or event.matched_keyword
+            or message.sender_id in flood_config.exempt_user_id
+            or message.mentions(event.self_id)
+        ):
+            return True
+        fingerprint = content_fingerprint(message)
+        if fingerprint is None:
+            return True
+        now = time.monotonic()
+        runs = self._groups.setdefault(message.peer_id, OrderedDict())
+        run = runs.get(fingerprint)
+        if run is None or now - run.last_at > flood_config.window:
+            if run is not None:
+                self._flush(run)
+            run = _Run(now)
+            runs[fingerprint] = run
+            if len(runs) > MAX_RUNS_PER_GROUP:
+                self._flush(runs.popitem(last=False)[1])
+        runs.move_to_end(fingerprint)
+        run.count += 1
+        run.last_at = now
+        if run.count <= flood_config.threshold:
+            return True
+        if not run.folded:
+            run.fold_started = now
+        run.folded += 1
+        run.last_event = event
+        self.stats["folded"] += 1
+        logger.debug("群 {} 的重复消息已折叠，当前累计 {} 条", message.peer_id, run.folded)
+        return False
+
+    def _flush(self, run: _Run) -> None:
+        """将折叠的重复消息合并为一条送出"""
+        if not run.folded or run.last_event is None:
+            return
+        event = run.last_event
+        event.repeat_count = run.folded
+        run.folded = 0
+        run.last_event = None
+        self.stats["summaries"] += 1
+        if self.sink is not None:
+            task = asyncio.get_running_loop().create_task(self.sink(event))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def sweep(self, now: Optional[float] = None) -> None:
+        """汇总已结束或持续超过一个窗口的重复，并清理过期记录"""
+        window = global_config.flood.window
+        now = time.monotonic() if now is None else now
+        for group_id in list(self._groups):
+            runs = self._groups[group_id]
+            for fingerprint in list(runs):
+                run = runs[fingerprint]
+                expired = now - run.last_at > window
+                if run.folded and (expired or now - run.fold_started >= window):
+                    self._flush(run)
+                if expired:
+                    del runs[fingerprint]
+            if not runs:
+                del self._groups[group_id]
+
+    async def sweep_loop(self, interval: float = 1) -> None:
+        """定期汇总，保证重复结束后汇总消息不会一直等到下一条消息才发出"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"汇总重复消息时发生错误: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "groups": len(self._groups), "tracked": sum(len(runs) for runs in self._groups.values())}
+
+
+flood_detector = FloodDetector()
+register_stats_provider("flood_detector", flood_detector.get_stats)
@@ -0,0 +1,146 @@
+"""
+出站表情的 GIF 转换结果缓存
+MaiBot 会反复发送同一批表情，以输入内容的摘要为键缓存转换结果，命中时完全跳过 PIL；
+内存缓存超出容量时可选择溢出到磁盘（data/gif_cache）
+"""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .config import global_config
+from .logger import logger
+from .stats import register_stats_provider
+
+SPILL_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "gif_cache")
+
+ALREADY_GIF = ""
+"""缓存值为空字符串表示输入本身就是 GIF，直接使用输入即可，避免重复保存"""
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="ascii") as f:
+        return f.read()
+
+
+def _write_text(path: str, content: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="ascii") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class GifCache:
+    def __init__(self, spill_dir: str):
+        self.spill_dir: str = spill_dir
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self.memory_size: int = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self.disk_size: int = 0
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "spills": 0}
+        if global_config.media.gif_cache_spill:
+            self._load_spill_dir()
+
+    def _load_spill_dir(self) -> None:
+        os.makedirs(self.spill_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._disk[name] = size
+            self.disk_size += size
+
+    async def get_or_convert(self, encoded_emoji: str, converter: Callable[[str], Awaitable[str]]) -> str:
+        """
+        获取表情的 GIF 版本，未命中时调用 converter 转换并缓存
+        Parameters:
+            encoded_emoji: str: Base64编码的表情
+            converter: Callable[[str], Awaitable[str]]: 转换函数，失败时应抛出异常（失败结果不缓存）
+        Returns:
+            str: Base64编码的GIF表情
+        """
+        # Base64 与原始字节一一对应，直接对编码后的字符串取摘要，省去一次解码
+        digest = hashlib.sha256(encoded_emoji.encode("ascii")).hexdigest()
+        cached = self._memory.get(digest)
+        if cached is not None:
+            self._memory.move_to_end(digest)
+            self.stats["hits"] += 1
+            return cached or encoded_emoji
+
+        cached = await self._read_spilled(digest)
+        if cached is not None:
+            self.stats["disk_hits"] += 1
+            await self._store(digest, cached)
+            return cached or encoded_emoji
+
+        self.stats["misses"] += 1
+        encoded_gif = await converter(encoded_emoji)
+        await self._store(digest, ALREADY_GIF if encoded_gif == encoded_emoji else encoded_gif)
+        return encoded_gif
+
+    async def _read_spilled(self, digest: str) -> Optional[str]:
+        if digest not in self._disk:
+            return None
+        try:
+            content = await asyncio.to_thread(_read_text, os.path.join(self.spill_dir, digest))
+        except OSError as e:
+            logger.warning(f"读取GIF缓存失败: {e}")
+            self.disk_size -= self._disk.pop(digest, 0)
+            return None
+        self._disk.move_to_end(digest)
+        return content
+
+    async def _store(self, digest: str, encoded_gif: str) -> None:
+        if digest in self._memory:
+            return
+        self._memory[digest] = encoded_gif
+        self.memory_size += len(encoded_gif)
+        max_size = global_config.media.gif_cache_max_mb * 1024 * 1024
+        while self.memory_size > max_size and self._memory:
+            evicted_digest, evicted = self._memory.popitem(last=False)
+            self.memory_size -= len(evicted)
+            if global_config.media.gif_cache_spill:
+                await self._spill(evicted_digest, evicted)
+
+    async def _spill(self, digest: str, encoded_gif: str) -> None:
+        if digest in self._disk:
+            return
+        try:
+            await asyncio.to_thread(_write_text, os.path.join(self.spill_dir, digest), encoded_gif)
+        except OSError as e:
+            logger.warning(f"写入GIF缓存失败: {e}")
+            return
+        self._disk[digest] = len(encoded_gif)
+        self.disk_size += len(encoded_gif)
+        self.stats["spills"] += 1
+        max_size = global_config.media.gif_cache_disk_max_mb * 1024 * 1024
+        while self.disk_size > max_size and self._disk:
+            evicted_digest, size = self._disk.popitem(last=False)
+            self.disk_size -= size
+            try:
+                os.remove(os.path.join(self.spill_dir, evicted_digest))
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
+        return {
+            **self.stats,
+            "hit_rate": round(hit_rate, 3),
+            "memory_entries": len(self._memory),
+            "memory_mb": round(self.memory_size / 1024 / 1024, 2),
+            "disk_entries": len(self._disk),
+            "disk_mb": round(self.disk_size / 1024 / 1024, 2),
+        }
+
+
+gif_cache = GifCache(SPILL_DIR)
+register_stats_provider("gif_cache", gif_cache.get_stats)
@@ -0,0 +1,100 @@
+"""
+图片处理的纯函数
+这些函数会在独立的进程/线程中执行，因此只依赖标准库与 PIL，不使用日志等全局状态
+"""
+
+import base64
+import io
+import time
+from typing import Any, Callable, Tuple
+
+from PIL import Image, ImageOps
+
+from .media_inspector import inspect_base64
+
+
+def timed_call(func: Callable[..., Any], args: tuple) -> Tuple[Any, float, float]:
+    """执行函数并返回 (结果, 开始时间, 结束时间)，用于区分排队等待与实际计算耗时"""
+    start_time = time.time()
+    result = func(*args)
+    return result, start_time, time.time()
+
+
+def get_image_format(raw_data: str) -> str:
+    """
+    从Base64编码的数据中确定图片的格式。
+    优先读取文件头，只有无法识别的格式才完整解码并交给PIL。
+    Parameters:
+        raw_data: str: Base64编码的图片数据。
+    Returns:
+        format: str: 图片的格式（例如 'jpeg', 'png', 'gif'）。
+    """
+    media_info = inspect_base64(raw_data)
+    if media_info.format:
+        return media_info.format
+    image_bytes = base64.b64decode(raw_data)
+    return Image.open(io.BytesIO(image_bytes)).format.lower()
+
+
+def convert_image_to_gif(image_base64: str) -> str:
+    """
+    将Base64编码的图片转换为GIF格式
+    Parameters:
+        image_base64: str: Base64编码的图片数据
+    Returns:
+        str: Base64编码的GIF图片数据
+    """
+    image_bytes = base64.b64decode(image_base64)
+    image = Image.open(io.BytesIO(image_bytes))
+    output_buffer = io.BytesIO()
+    image.save(output_buffer, format="GIF")
+    output_buffer.seek(0)
+    return base64.b64encode(output_buffer.read()).decode("utf-8")
+
+
+DOWNSCALE_MAX_ATTEMPTS = 6
+"""为满足大小上限最多重新编码的次数"""
+
+DOWNSCALE_MIN_QUALITY = 40
+"""为满足大小上限时降低编码质量的下限"""
+
+
+def _encode_image(image: Image.Image, image_format: str, quality: int) -> bytes:
+    output_buffer = io.BytesIO()
+    image.save(output_buffer, format=image_format.upper(), quality=quality, optimize=True)
+    return output_buffer.getvalue()
+
+
+def downscale_image(image_base64: str, max_dimension: int, image_format: str, quality: int, max_bytes: int = 0) -> str:
+    """
+    缩小并重新编码图片，结果超过大小上限时逐步降低质量、再缩小尺寸，最多尝试 DOWNSCALE_MAX_ATTEMPTS 次
+    Parameters:
+        image_base64: str: Base64编码的图片数据
+        max_dimension: int: 长边的最大像素数
+        image_format: str: 输出格式（jpeg/webp/png）
+        quality: int: 有损格式的编码质量
+        max_bytes: int: 输出大小上限（字节），为0时不限制
+    Returns:
+        str: Base64编码的新图片数据，多次尝试后仍超限时返回最后一次的结果
+    """
+    image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+    # 重新编码会丢失 EXIF，先按方向信息把图片转正
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    if image_format == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    encoded = _encode_image(image, image_format, quality)
+    lossy = image_format != "png"
+    for _ in range(DOWNSCALE_MAX_ATTEMPTS):
+        if not max_bytes or len(encoded) <= max_bytes:
+            break
+        if lossy and quality > DOWNSCALE_MIN_QUALITY:
+            quality = max(DOWNSCALE_MIN_QUALITY, quality - 15)
+        else:
+            # 质量已降到下限，按超出比例缩小尺寸（面积与大小近似成正比）
+            scale = max(0.5, min(0.9, (max_bytes / len(encoded)) ** 0.5))
+            new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(new_size, Image.LANCZOS)
+        encoded = _encode_image(image, image_format, quality)
+    return base64.b64encode(encoded).decode("utf-8")
@@ -0,0 +1,80 @@
+"""
+图片处理执行器
+将 PIL 解码/编码等 CPU 密集操作放到进程池（或线程池）中执行，避免阻塞事件循环
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .config import global_config
+from .image_ops import timed_call
+from .logger import logger
+from .stats import Histogram, register_stats_provider
+
+
+class ImagePool:
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queue_wait = Histogram([0.001, 0.01, 0.05, 0.1, 0.5, 1, 5])
+        """任务排队等待时间（秒）"""
+        self.compute = Histogram([0.01, 0.05, 0.1, 0.5, 1, 5])
+        """任务实际计算时间（秒）"""
+        self.stats: Dict[str, int] = {"jobs": 0, "timeouts": 0, "failures": 0}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            workers = max(1, global_config.media.image_workers)
+            if global_config.media.image_executor == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+            # 限制同时提交的任务数，多余的任务在事件循环中排队
+            self._semaphore = asyncio.Semaphore(workers * 2)
+            logger.info(f"图片处理{global_config.media.image_executor}池已启动，worker 数量: {workers}")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在执行器中运行图片处理函数
+        Parameters:
+            func: Callable: image_ops 中的顶层函数（进程池要求可被 pickle）
+            *args: 函数参数
+        Returns:
+            Any: 函数返回值，超过 image_job_timeout 时抛出 asyncio.TimeoutError
+        """
+        executor = self._get_executor()
+        submit_time = time.time()
+        async with self._semaphore:
+            future = asyncio.get_running_loop().run_in_executor(executor, timed_call, func, args)
+            try:
+                result, start_time, end_time = await asyncio.wait_for(future, global_config.media.image_job_timeout)
+            except asyncio.TimeoutError:
+                # 已开始的任务无法中断，只能放弃等待其结果
+                self.stats["timeouts"] += 1
+                raise
+            except Exception:
+                self.stats["failures"] += 1
+                raise
+        self.stats["jobs"] += 1
+        self.queue_wait.observe(max(0.0, start_time - submit_time))
+        self.compute.observe(end_time - start_time)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queue_wait_s": self.queue_wait.snapshot(),
+            "compute_s": self.compute.snapshot(),
+        }
+
+
+image_pool = ImagePool()
+register_stats_provider("image_pool", image_pool.get_stats)
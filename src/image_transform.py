@@ -0,0 +1,89 @@
+"""
+入站图片的缩放与重新编码
+手机截图、照片等大图在转发给 MaiBot 前按配置缩小，减少带宽、内存以及识图模型的开销；
+表情包与动图不做处理
+"""
+
+from typing import Any, Dict
+
+from .config import global_config
+from .image_ops import downscale_image
+from .image_pool import image_pool
+from .logger import logger
+from .media_inspector import inspect_base64
+from .stats import Histogram, register_stats_provider
+
+transform_stats: Dict[str, int] = {"transformed": 0, "skipped": 0, "failures": 0, "bytes_saved": 0}
+saved_kib = Histogram([16, 64, 256, 1024, 4096])
+"""每张图片节省的大小（KiB）"""
+
+
+def transform_cache_suffix() -> str:
+    """
+    缩放设置对应的缓存标识后缀，普通图片按缩放后的结果缓存，设置不同的结果不共用
+    Returns:
+        str: 未启用缩放时为空字符串
+    """
+    media_config = global_config.media
+    if not media_config.downscale_enabled:
+        return ""
+    return (
+        f"#downscale:{media_config.downscale_max_dimension}:{media_config.downscale_max_kb}"
+        f":{media_config.downscale_format}:{media_config.downscale_quality}"
+    )
+
+
+async def transform_inbound_image(image_base64: str) -> str:
+    """
+    按配置缩小入站图片，失败或没有收益时返回原图
+    Parameters:
+        image_base64: str: Base64编码的图片数据
+    Returns:
+        str: Base64编码的图片数据
+    """
+    media_config = global_config.media
+    if not media_config.downscale_enabled:
+        return image_base64
+    media_info = inspect_base64(image_base64)
+    if media_info.format == "gif" or media_info.animated:
+        transform_stats["skipped"] += 1
+        return image_base64
+    original_size = len(image_base64) * 3 // 4
+    if (
+        max(media_info.width, media_info.height) <= media_config.downscale_max_dimension
+        and original_size <= media_config.downscale_max_kb * 1024
+    ):
+        transform_stats["skipped"] += 1
+        return image_base64
+    try:
+        new_base64 = await image_pool.run(
+            downscale_image,
+            image_base64,
+            media_config.downscale_max_dimension,
+            media_config.downscale_format,
+            media_config.downscale_quality,
+            media_config.downscale_max_kb * 1024,
+        )
+    except Exception as e:
+        transform_stats["failures"] += 1
+        logger.warning(f"图片缩放失败，使用原图: {e}")
+        return image_base64
+    saved = (len(image_base64) - len(new_base64)) * 3 // 4
+    if saved <= 0:
+        transform_stats["skipped"] += 1
+        return image_base64
+    transform_stats["transformed"] += 1
+    transform_stats["bytes_saved"] += saved
+    saved_kib.observe(saved / 1024)
+    logger.debug(
+        f"图片已缩放: {media_info.width}x{media_info.height} {media_info.format}, "
+        f"{original_size} -> {original_size - saved} 字节"
+    )
+    return new_base64
+
+
+def get_transform_stats() -> Dict[str, Any]:
+    return {**transform_stats, "saved_kib": saved_kib.snapshot()}
+
+
+register_stats_provider("image_transform", get_transform_stats)
@@ -0,0 +1,71 @@
+"""
+JSON 编解码
+优先使用 orjson，其次 msgspec，都未安装时回退到标准库 json；
+解码直接接受 bytes，编码可直接输出 bytes，避免多余的 str/bytes 转换
+"""
+
+import json
+from typing import Any, Union
+
+JSONDecodeError = ValueError
+"""解码失败时抛出的异常基类（json.JSONDecodeError、orjson.JSONDecodeError、msgspec.DecodeError 都是其子类）"""
+
+try:
+    import orjson
+
+    backend: str = "orjson"
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        return orjson.loads(data)
+
+    def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+except ImportError:
+    try:
+        import msgspec
+
+        backend = "msgspec"
+        _decoder = msgspec.json.Decoder()
+        _encoder = msgspec.json.Encoder()
+
+        def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+            try:
+                return _decoder.decode(data)
+            except msgspec.DecodeError as e:
+                raise JSONDecodeError(str(e)) from e
+
+        def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+            if sort_keys:
+                return msgspec.json.encode(obj, order="sorted")
+            return _encoder.encode(obj)
+
+    except ImportError:
+        backend = "json"
+
+        def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+            if isinstance(data, memoryview):
+                data = bytes(data)
+            return json.loads(data)
+
+        def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+            return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """编码为紧凑的 JSON 字符串（不转义非 ASCII 字符）"""
+    return dumps_bytes(obj, sort_keys).decode("utf-8")
+
+
+def dumps_event(post_type: str, event_json: Union[str, bytes]) -> str:
+    """
+    生成 MessageBase.raw_message，直接拼接事件的原始 JSON 文本，不再重新序列化整个事件
+    Parameters:
+        post_type: str: 内部处理分类（message/notice/meta_event）
+        event_json: str | bytes: Milky 事件的 JSON 文本
+    Returns:
+        str: {"post_type": ..., "data": 事件} 形式的 JSON 字符串
+    """
+    if not isinstance(event_json, str):
+        event_json = bytes(event_json).decode("utf-8")
+    return f'{{"post_type":{dumps(post_type)},"data":{event_json}}}'
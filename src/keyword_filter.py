@@ -0,0 +1,160 @@
+"""
+入口处的昵称/关键词预过滤
+机器人昵称、别名与配置的关键词编译为一个 Aho-Corasick 自动机，对普通群消息的文本段做一次线性扫描：
+命中的消息标记后进入高优先级通道，未命中的按群策略放行、采样或丢弃，减轻 MaiBot 的负载与转发流量
+"""
+
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, List, Literal, Optional
+
+from .config import global_config
+from .logger import logger
+from .milky_events import IncomingMessage, MilkyEvent
+from .stats import register_stats_provider
+
+PrefilterPolicy = Literal["pass", "sample", "drop"]
+POLICIES = ("pass", "sample", "drop")
+
+
+class AhoCorasick:
+    """多模式串匹配自动机，匹配不区分大小写"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]
+        """状态 -> 在此结束的模式串（含经由失配链可达的），没有时为 None"""
+        self.patterns: List[str] = []
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        folded = pattern.casefold()
+        if not folded:
+            return
+        state = 0
+        for char in folded:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._goto[state][char] = next_state
+            state = next_state
+        if self._output[state] is None:
+            self._output[state] = pattern
+            self.patterns.append(pattern)
+
+    def _build(self) -> None:
+        queue: Deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Optional[str]:
+        """
+        查找文本中最先出现的模式串
+        Returns:
+            str | None: 命中的模式串，未命中时为 None
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+def _message_text(message: IncomingMessage) -> str:
+    return "\n".join(
+        (segment.get("data") or {}).get("text", "") for segment in message.segments if segment.get("type") == "text"
+    )
+
+
+def _parse_group_policies(entries: List[str]) -> Dict[int, PrefilterPolicy]:
+    policies: Dict[int, PrefilterPolicy] = {}
+    for entry in entries:
+        group_id, _, policy = str(entry).partition(":")
+        try:
+            if policy not in POLICIES:
+                raise ValueError
+            policies[int(group_id)] = policy
+        except ValueError:
+            logger.warning(f"prefilter.group_policy 中的条目 {entry!r} 格式无效，应为 \"群号:pass/sample/drop\"，已忽略")
+    return policies
+
+
+class KeywordPrefilter:
+    def __init__(self):
+        self.automaton: AhoCorasick = AhoCorasick(())
+        self.group_policies: Dict[int, PrefilterPolicy] = {}
+        self._sample_counters: Counter = Counter()
+        """群号 -> 未命中消息计数，用于采样"""
+        self.stats: Counter = Counter()
+        self.compile(global_config.nickname, global_config.prefilter)
+
+    def compile(self, nickname_config, prefilter_config) -> None:
+        """编译昵称、别名与关键词，替换是原子的"""
+        patterns = [nickname_config.nickname, *nickname_config.alias_names, *prefilter_config.keywords]
+        self.automaton = AhoCorasick(patterns)
+        self.group_policies = _parse_group_policies(prefilter_config.group_policy)
+
+    def admit(self, event: MilkyEvent) -> bool:
+        """
+        预过滤未 @ 机器人的群消息，命中时在 event.matched_keyword 上标记
+        Returns:
+            bool: 是否放行
+        """
+        prefilter_config = global_config.prefilter
+        message = event.data
+        if (
+            not prefilter_config.enable
+            or not isinstance(message, IncomingMessage)
+            or message.message_scene != "group"
+            or message.mentions(event.self_id)
+        ):
+            return True
+        matched = self.automaton.search(_message_text(message))
+        if matched is not None:
+            event.matched_keyword = matched
+            self.stats["matched"] += 1
+            return True
+        policy = self.group_policies.get(message.peer_id, prefilter_config.policy)
+        if policy == "pass" or (policy == "sample" and prefilter_config.sample_every <= 0):
+            self.stats["passed"] += 1
+            return True
+        if policy == "sample":
+            self._sample_counters[message.peer_id] += 1
+            if (self._sample_counters[message.peer_id] - 1) % prefilter_config.sample_every == 0:
+                self.stats["sampled"] += 1
+                return True
+        self.stats["dropped"] += 1
+        return False
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "patterns": len(self.automaton.patterns)}
+
+
+keyword_prefilter = KeywordPrefilter()
+register_stats_provider("prefilter", keyword_prefilter.get_stats)
+
+
+def _on_config_reload(old_config, new_config) -> None:
+    if old_config.nickname != new_config.nickname or old_config.prefilter != new_config.prefilter:
+        keyword_prefilter.compile(new_config.nickname, new_config.prefilter)
+        logger.info(f"预过滤关键词已更新，共 {len(keyword_prefilter.automaton.patterns)} 个")
+
+
+global_config.subscribe(_on_config_reload)
@@ -0,0 +1,107 @@
+"""
+日志内容的截断与脱敏
+配合 loguru 的延迟格式化使用：logger.debug("事件: {}", redacted(event))，
+只有日志确实会被输出时才会生成字符串，且 Base64 媒体、链接中的鉴权参数不会原样写入日志
+"""
+
+import dataclasses
+import re
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+MAX_STRING_CHARS: int = 200
+"""单个字符串保留的最大字符数"""
+
+MAX_ITEMS: int = 20
+"""列表/字典保留的最大元素数"""
+
+MAX_DEPTH: int = 6
+"""最大嵌套层数"""
+
+SENSITIVE_QUERY_KEYS = frozenset({"rkey", "access_token", "token"})
+"""链接中需要隐藏的查询参数"""
+
+_BASE64_PREFIX_RE = re.compile(r"[A-Za-z0-9+/=\r\n]{64}")
+
+
+def _redact_base64(length: int) -> str:
+    return f"<base64 {length} chars>"
+
+
+def redact_url(url: str) -> str:
+    """隐藏链接中的鉴权参数"""
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [(k, "***" if k in SENSITIVE_QUERY_KEYS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query, safe="*"), parts.fragment))
+
+
+def truncate_text(text: Any, max_chars: int = MAX_STRING_CHARS) -> str:
+    """截断过长的文本，保留开头部分与原长度"""
+    text = text if isinstance(text, str) else str(text)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}...({len(text)} chars)"
+
+
+def _redact_str(value: str, key: Any = None) -> str:
+    if value.startswith("base64://"):
+        return "base64://" + _redact_base64(len(value) - 9)
+    if key == "base64":
+        return _redact_base64(len(value))
+    if value.startswith(("http://", "https://")):
+        return truncate_text(redact_url(value))
+    if len(value) > MAX_STRING_CHARS and _BASE64_PREFIX_RE.match(value):
+        # 不带前缀的裸 Base64（如 Seg 中的图片数据）
+        return _redact_base64(len(value))
+    return truncate_text(value)
+
+
+def redact(value: Any, key: Any = None, depth: int = 0) -> Any:
+    """
+    生成适合写入日志的副本：Base64 媒体替换为长度说明，链接隐藏鉴权参数，过长的字符串和容器被截断
+    Parameters:
+        value: Any: 任意可序列化的值，dataclass 与带 to_dict 方法的对象会先转换为 dict
+        key: Any: value 在上层字典中的键
+    Returns:
+        Any: 处理后的副本，原对象不会被修改
+    """
+    if isinstance(value, str):
+        return _redact_str(value, key)
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    if depth >= MAX_DEPTH:
+        return "..."
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        value = {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+    elif hasattr(value, "to_dict") and callable(value.to_dict):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        items = list(value.items())
+        result = {k: redact(v, k, depth + 1) for k, v in items[:MAX_ITEMS]}
+        if len(items) > MAX_ITEMS:
+            result["..."] = f"{len(items) - MAX_ITEMS} more"
+        return result
+    if isinstance(value, (list, tuple)):
+        result = [redact(v, key, depth + 1) for v in value[:MAX_ITEMS]]
+        if len(value) > MAX_ITEMS:
+            result.append(f"...{len(value) - MAX_ITEMS} more")
+        return result
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    return truncate_text(repr(value))
+
+
+class redacted:
+    """延迟脱敏：作为 loguru 的格式化参数传入，只有在日志被输出时才会执行 redact"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return str(redact(self.value))
+
+    __repr__ = __str__
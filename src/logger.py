@@ -1,21 +1,167 @@
 from loguru import logger
 from .config import global_config
+import json
+import os
 import sys
+import time
+from typing import Any, Dict, Hashable, List
+
+TEXT_FORMAT = "<blue>{time:YYYY-MM-DD HH:mm:ss}</blue> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+MAIM_MESSAGE_FORMAT = "<red>{time:YYYY-MM-DD HH:mm:ss}</red> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+FILE_TEXT_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}"
+
+RATE_LIMIT_MIN_LEVEL = 40
+"""ERROR 及以上级别的日志不做限流"""
+
+
+class LogRateLimiter:
+    """
+    按日志键限流：同一键在一个窗口内只输出前 burst 条，之后每 sample_every 条采样输出一条，
+    被抑制的条数会附加在下一条输出的日志上。日志键默认为调用位置，可通过 logger.bind(rate_key=...) 指定
+    """
+
+    MAX_KEYS = 4096
+
+    def __init__(self):
+        self._states: Dict[Hashable, List[Any]] = {}
+        """日志键 -> [窗口开始时间, 窗口内条数, 未报告的抑制条数]"""
+        self.suppressed_total: int = 0
+
+    def __call__(self, record: dict) -> None:
+        debug_config = global_config.debug
+        burst = debug_config.log_rate_limit_burst
+        if burst <= 0 or record["level"].no >= RATE_LIMIT_MIN_LEVEL:
+            return
+        extra = record["extra"]
+        key = extra.get("rate_key") or (record["name"], record["function"], record["line"])
+        now = time.monotonic()
+        state = self._states.get(key)
+        if state is None or now - state[0] >= debug_config.log_rate_limit_window:
+            suppressed = state[2] if state else 0
+            if state is None and len(self._states) >= self.MAX_KEYS:
+                self._prune(now, debug_config.log_rate_limit_window)
+            self._states[key] = [now, 1, 0]
+            self._annotate(record, suppressed)
+            return
+        state[1] += 1
+        excess = state[1] - burst
+        if excess <= 0:
+            return
+        sample_every = debug_config.log_sample_every
+        if sample_every > 0 and excess % sample_every == 0:
+            self._annotate(record, state[2])
+            state[2] = 0
+            return
+        state[2] += 1
+        self.suppressed_total += 1
+        extra["_suppressed"] = True
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"suppressed": self.suppressed_total, "keys": len(self._states)}
+
+    def _annotate(self, record: dict, suppressed: int) -> None:
+        if suppressed:
+            record["message"] += f"（此前 {suppressed} 条相同日志已被抑制）"
+
+    def _prune(self, now: float, window: float) -> None:
+        self._states = {key: state for key, state in self._states.items() if now - state[0] < window}
+        if len(self._states) >= self.MAX_KEYS:
+            self._states.clear()
+
+
+def _json_format(record: dict) -> str:
+    """JSON Lines 格式，字段固定，缺失的上下文字段为 null"""
+    extra = record["extra"]
+    received_at = extra.get("received_at")
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": extra.get("name"),
+        "module": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        "event_type": extra.get("event_type"),
+        "group_id": extra.get("group_id"),
+        "latency_ms": round((time.monotonic() - received_at) * 1000, 3) if received_at else None,
+        "exception": str(record["exception"].value) if record["exception"] else None,
+    }
+    extra["_json"] = json.dumps(payload, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
+
+def _not_suppressed(record: dict) -> bool:
+    return not record["extra"].get("_suppressed")
+
+
+def _is_adapter_record(record: dict) -> bool:
+    return _not_suppressed(record) and record["extra"].get("name") != "maim_message"
+
+
+def _is_maim_message_record(record: dict) -> bool:
+    return _not_suppressed(record) and record["extra"].get("name") == "maim_message"
+
+
+def _add_sinks(debug_config) -> List[int]:
+    """按 [debug] 配置添加日志输出，返回 sink id"""
+    json_output = debug_config.log_format == "json"
+    sink_ids = [
+        logger.add(
+            sys.stderr,
+            level=debug_config.level,
+            format=_json_format if json_output else TEXT_FORMAT,
+            filter=_is_adapter_record,
+            enqueue=True,
+        ),
+        logger.add(
+            sys.stderr,
+            level="INFO",
+            format=_json_format if json_output else MAIM_MESSAGE_FORMAT,
+            filter=_is_maim_message_record,
+            enqueue=True,
+        ),
+    ]
+    if debug_config.log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(debug_config.log_file)), exist_ok=True)
+        sink_ids.append(
+            logger.add(
+                debug_config.log_file,
+                level=debug_config.level,
+                format=_json_format if json_output else FILE_TEXT_FORMAT,
+                filter=_not_suppressed,
+                rotation=debug_config.log_file_max_mb * 1024 * 1024,
+                retention=debug_config.log_file_retention,
+                encoding="utf-8",
+                enqueue=True,
+            )
+        )
+    return sink_ids
+
+
+SINK_FIELDS = ("level", "log_format", "log_file", "log_file_max_mb", "log_file_retention")
+"""修改后需要重建日志输出的 [debug] 配置项"""
+
+
+def _on_config_reload(old_config, new_config) -> None:
+    global _sink_ids
+    if all(getattr(old_config.debug, name) == getattr(new_config.debug, name) for name in SINK_FIELDS):
+        return
+    # 先添加新的输出再移除旧的，切换过程中不会丢失日志
+    new_sink_ids = _add_sinks(new_config.debug)
+    for sink_id in _sink_ids:
+        logger.remove(sink_id)
+    _sink_ids = new_sink_ids
+    logger.info(f"日志配置已更新，日志级别: {new_config.debug.level}")
+
+
+rate_limiter = LogRateLimiter()
 
 # 默认 logger
+# enqueue=True 时由后台线程写出，终端或磁盘阻塞不会卡住事件循环
 logger.remove()
-logger.add(
-    sys.stderr,
-    level=global_config.debug.level,
-    format="<blue>{time:YYYY-MM-DD HH:mm:ss}</blue> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    filter=lambda record: "name" not in record["extra"] or record["extra"].get("name") != "maim_message",
-)
-logger.add(
-    sys.stderr,
-    level="INFO",
-    format="<red>{time:YYYY-MM-DD HH:mm:ss}</red> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    filter=lambda record: record["extra"].get("name") == "maim_message",
-)
+logger.configure(patcher=rate_limiter)
+_sink_ids: List[int] = _add_sinks(global_config.debug)
+global_config.subscribe(_on_config_reload)
 # 创建样式不同的 logger
 custom_logger = logger.bind(name="maim_message")
 logger = logger.bind(name="MaiBot-Milky-Adapter")
@@ -0,0 +1,118 @@
+"""
+在途媒体内存预算
+统计收发两个方向上同时驻留在内存中的 Base64 媒体总量；超出预算时推迟新的下载，
+发送方向在启用文件中转时改为写入中转目录，否则等待其他消息释放
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from .config import global_config
+from .logger import logger
+from .stats import Histogram, register_stats_provider
+
+
+class MediaLedger:
+    """一条消息占用的媒体内存，消息发送完成后调用 release 归还"""
+
+    def __init__(self, budget: "MediaBudget"):
+        self._budget = budget
+        self.size: int = 0
+
+    def charge(self, size: int) -> None:
+        """记入 size 字节，负数表示归还一部分（如图片被压缩后）"""
+        size = max(size, -self.size)
+        self.size += size
+        self._budget._adjust(size)
+
+    async def reserve(self, size: int = 0) -> None:
+        """等待预算有空余后记入 size 字节"""
+        await self._budget.wait_for_room(size)
+        self.charge(size)
+
+    def release(self) -> None:
+        size, self.size = self.size, 0
+        self._budget._adjust(-size)
+
+
+class MediaBudget:
+    def __init__(self):
+        self.in_use: int = 0
+        self.peak: int = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.stats: Dict[str, int] = {"waits": 0, "wait_timeouts": 0, "spills": 0}
+        self.wait_histogram = Histogram([0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30])
+
+    @property
+    def limit(self) -> int:
+        """预算上限（字节），为 0 时不限制"""
+        return global_config.media.memory_budget_mb * 1024 * 1024
+
+    def has_room(self, size: int = 0) -> bool:
+        limit = self.limit
+        # 预算为空时总是放行，保证单个超大媒体也能处理
+        return limit <= 0 or self.in_use == 0 or (self.in_use < limit and self.in_use + size <= limit)
+
+    def ledger(self) -> MediaLedger:
+        return MediaLedger(self)
+
+    def record_spill(self) -> None:
+        self.stats["spills"] += 1
+
+    async def wait_for_room(self, size: int = 0) -> None:
+        """
+        等待预算中有 size 字节的空余
+        超过 memory_wait_timeout 仍未等到时放行并记录，避免互相持有内存的消息永久等待
+        """
+        if self.has_room(size):
+            return
+        self.stats["waits"] += 1
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + global_config.media.memory_wait_timeout
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.has_room(size):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["wait_timeouts"] += 1
+                    logger.warning(
+                        f"媒体内存预算已满（{self.in_use / 1024 / 1024:.1f} MB），等待超时，继续处理"
+                    )
+                    return
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - start_time)
+
+    def _adjust(self, size: int) -> None:
+        self.in_use += size
+        if self.in_use > self.peak:
+            self.peak = self.in_use
+        if size < 0:
+            # 有内存归还时唤醒所有等待者，由它们各自重新判断
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_use_mb": round(self.in_use / 1024 / 1024, 2),
+            "peak_mb": round(self.peak / 1024 / 1024, 2),
+            "waiting": len(self._waiters),
+            "wait_seconds": self.wait_histogram.snapshot(),
+        }
+
+
+media_budget = MediaBudget()
+register_stats_provider("media_budget", media_budget.get_stats)
@@ -0,0 +1,190 @@
+"""
+按内容寻址的入站媒体磁盘缓存
+以图片的稳定标识（resource_id / file_id / 去掉 rkey 的 URL）映射到内容的 sha256，
+文件以 sha256 命名保存在 data/media_cache/blobs 下，按总大小做 LRU 淘汰，重启后索引仍然有效
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import mmap
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .config import global_config
+from .logger import logger
+from .stats import register_stats_provider
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "media_cache")
+
+# URL 中每次都会变化的鉴权参数，不参与标识计算
+VOLATILE_QUERY_KEYS = frozenset({"rkey"})
+
+
+def image_identifier(message_data: dict) -> Optional[str]:
+    """
+    计算图片消息段的稳定标识
+    Parameters:
+        message_data: dict: 图片消息段的 data 字段
+    Returns:
+        str | None: 稳定标识，无法确定时返回 None
+    """
+    resource_id = message_data.get("resource_id") or message_data.get("file_id")
+    if resource_id:
+        return f"id:{resource_id}"
+    url = message_data.get("temp_url") or message_data.get("url")
+    if not url:
+        return None
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_QUERY_KEYS]
+    return "url:" + urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def _read_base64(path: str) -> str:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm).decode("ascii")
+
+
+def _write_blob(blob_dir: str, image_base64: str) -> tuple[str, int]:
+    data = base64.b64decode(image_base64)
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.join(blob_dir, digest)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return digest, len(data)
+
+
+class MediaCache:
+    def __init__(self, cache_dir: str):
+        self.cache_dir: str = cache_dir
+        self.blob_dir: str = os.path.join(cache_dir, "blobs")
+        self.index_path: str = os.path.join(cache_dir, "index.json")
+        self._keys: Dict[str, str] = {}
+        """标识 -> 内容 sha256"""
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()
+        """内容 sha256 -> 文件大小，按最近使用排序"""
+        self.total_size: int = 0
+        self._dirty: bool = False
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._load_index()
+
+    def _load_index(self) -> None:
+        os.makedirs(self.blob_dir, exist_ok=True)
+        index: dict = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except Exception as e:
+                logger.warning(f"媒体缓存索引读取失败，将重建索引: {e}")
+        # 以磁盘上实际存在的文件为准
+        on_disk = {name: os.path.getsize(os.path.join(self.blob_dir, name)) for name in os.listdir(self.blob_dir)}
+        for digest in index.get("blobs", []):
+            if digest in on_disk:
+                self._blobs[digest] = on_disk.pop(digest)
+        for digest, size in on_disk.items():
+            if digest.endswith(".tmp"):
+                os.remove(os.path.join(self.blob_dir, digest))
+                continue
+            self._blobs[digest] = size
+            self._blobs.move_to_end(digest, last=False)
+        self._keys = {key: digest for key, digest in index.get("keys", {}).items() if digest in self._blobs}
+        self.total_size = sum(self._blobs.values())
+        logger.info(f"媒体缓存已加载: {len(self._blobs)} 个文件, {self.total_size / 1024 / 1024:.1f} MB")
+
+    def _key(self, identifier: str) -> str:
+        return hashlib.sha256(identifier.encode("utf-8")).hexdigest()
+
+    async def get_base64(self, identifier: str) -> Optional[str]:
+        """命中时返回 Base64 编码的内容，否则返回 None"""
+        if not global_config.media.cache_enabled:
+            return None
+        digest = self._keys.get(self._key(identifier))
+        if digest is None or digest not in self._blobs:
+            self.stats["misses"] += 1
+            return None
+        try:
+            image_base64 = await asyncio.to_thread(_read_base64, os.path.join(self.blob_dir, digest))
+        except OSError as e:
+            logger.warning(f"读取媒体缓存失败: {e}")
+            self.total_size -= self._blobs.pop(digest, 0)
+            self.stats["misses"] += 1
+            return None
+        self._blobs.move_to_end(digest)
+        self._dirty = True
+        self.stats["hits"] += 1
+        return image_base64
+
+    async def put_base64(self, identifier: str, image_base64: str) -> None:
+        """保存内容并建立标识映射，超出容量时按 LRU 淘汰"""
+        if not global_config.media.cache_enabled or not image_base64:
+            return
+        try:
+            digest, size = await asyncio.to_thread(_write_blob, self.blob_dir, image_base64)
+        except Exception as e:
+            logger.warning(f"写入媒体缓存失败: {e}")
+            return
+        self._keys[self._key(identifier)] = digest
+        if digest not in self._blobs:
+            self._blobs[digest] = size
+            self.total_size += size
+            self.stats["stores"] += 1
+        self._blobs.move_to_end(digest)
+        self._dirty = True
+        await self._evict()
+
+    async def _evict(self) -> None:
+        max_size = global_config.media.cache_max_mb * 1024 * 1024
+        evicted: list[str] = []
+        while self.total_size > max_size and len(self._blobs) > 1:
+            digest, size = self._blobs.popitem(last=False)
+            self.total_size -= size
+            evicted.append(digest)
+        if not evicted:
+            return
+        self.stats["evictions"] += len(evicted)
+        evicted_set = set(evicted)
+        self._keys = {key: digest for key, digest in self._keys.items() if digest not in evicted_set}
+        await asyncio.to_thread(self._remove_blobs, evicted)
+
+    def _remove_blobs(self, digests: list[str]) -> None:
+        for digest in digests:
+            try:
+                os.remove(os.path.join(self.blob_dir, digest))
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """将索引写回磁盘"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"keys": self._keys, "blobs": list(self._blobs.keys())}, f)
+        os.replace(tmp_path, self.index_path)
+
+    async def flush_loop(self, interval: int = 30) -> None:
+        """定期保存索引"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"保存媒体缓存索引失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "files": len(self._blobs), "size_mb": round(self.total_size / 1024 / 1024, 2)}
+
+
+media_cache = MediaCache(CACHE_DIR)
+register_stats_provider("media_cache", media_cache.get_stats)
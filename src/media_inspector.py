@@ -0,0 +1,229 @@
+"""
+基于文件头的媒体信息识别
+只解码 Base64 中实际需要的少量字节，从 PNG/JPEG/GIF/WebP 的文件头中读取格式、尺寸和帧数，
+无需完整解码，也无需 PIL
+"""
+
+import base64
+import binascii
+import struct
+from dataclasses import dataclass
+from typing import Optional, Union
+
+MAX_WALK_STEPS = 1 << 16
+"""遍历文件结构时的最大步数，防止畸形数据导致死循环"""
+
+
+@dataclass
+class MediaInfo:
+    format: Optional[str] = None
+    """图片格式（png/jpeg/gif/webp），无法识别时为 None"""
+
+    width: int = 0
+    height: int = 0
+
+    frames: int = 1
+    """帧数，静态图片为 1"""
+
+    @property
+    def animated(self) -> bool:
+        return self.frames > 1
+
+
+class _Base64Reader:
+    """按需解码 Base64 的随机读取器，每次只解码覆盖所需字节的最小 4 字符对齐区间"""
+
+    def __init__(self, data: str):
+        self.data = data
+        self.size = len(data) // 4 * 3 - data[-2:].count("=") if data else 0
+
+    def read(self, offset: int, length: int) -> bytes:
+        if offset < 0 or length <= 0 or offset >= self.size:
+            return b""
+        start_char = offset // 3 * 4
+        end_char = (offset + length + 2) // 3 * 4
+        chunk = base64.b64decode(self.data[start_char:end_char])
+        skip = offset % 3
+        return chunk[skip : skip + length]
+
+
+class _BytesReader:
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self.data = data
+        self.size = len(data)
+
+    def read(self, offset: int, length: int) -> bytes:
+        if offset < 0 or length <= 0:
+            return b""
+        return bytes(self.data[offset : offset + length])
+
+
+def _inspect_png(reader) -> MediaInfo:
+    info = MediaInfo(format="png")
+    ihdr = reader.read(16, 8)
+    if len(ihdr) == 8:
+        info.width, info.height = struct.unpack(">II", ihdr)
+    # APNG 的 acTL 块位于第一个 IDAT 之前
+    offset = 8
+    for _ in range(MAX_WALK_STEPS):
+        header = reader.read(offset, 8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type == b"acTL":
+            actl = reader.read(offset + 8, 4)
+            if len(actl) == 4:
+                info.frames = max(1, struct.unpack(">I", actl)[0])
+            break
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        offset += 12 + length
+    return info
+
+
+def _inspect_jpeg(reader) -> MediaInfo:
+    info = MediaInfo(format="jpeg")
+    offset = 2
+    for _ in range(MAX_WALK_STEPS):
+        marker = reader.read(offset, 2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            break
+        marker_type = marker[1]
+        if marker_type == 0xFF:  # 填充字节
+            offset += 1
+            continue
+        if marker_type in (0x01, 0xD8) or 0xD0 <= marker_type <= 0xD7:  # 无长度的独立标记
+            offset += 2
+            continue
+        if marker_type in (0xD9, 0xDA):  # 图像结束 / 扫描数据开始
+            break
+        length_bytes = reader.read(offset + 2, 2)
+        if len(length_bytes) < 2:
+            break
+        segment_length = struct.unpack(">H", length_bytes)[0]
+        if 0xC0 <= marker_type <= 0xCF and marker_type not in (0xC4, 0xC8, 0xCC):
+            sof = reader.read(offset + 5, 4)
+            if len(sof) == 4:
+                info.height, info.width = struct.unpack(">HH", sof)
+            break
+        offset += 2 + segment_length
+    return info
+
+
+def _skip_gif_sub_blocks(reader, offset: int) -> int:
+    for _ in range(MAX_WALK_STEPS):
+        size = reader.read(offset, 1)
+        if not size:
+            return -1
+        offset += 1
+        if size[0] == 0:
+            return offset
+        offset += size[0]
+    return -1
+
+
+def _inspect_gif(reader) -> MediaInfo:
+    info = MediaInfo(format="gif", frames=0)
+    header = reader.read(6, 5)
+    if len(header) < 5:
+        info.frames = 1
+        return info
+    info.width, info.height, flags = struct.unpack("<HHB", header)
+    offset = 13
+    if flags & 0x80:
+        offset += 3 * (1 << ((flags & 0x07) + 1))
+    for _ in range(MAX_WALK_STEPS):
+        block = reader.read(offset, 1)
+        if not block or block[0] == 0x3B:  # 数据结束 / 文件尾
+            break
+        if block[0] == 0x2C:  # 图像描述符
+            info.frames += 1
+            descriptor = reader.read(offset + 1, 9)
+            if len(descriptor) < 9:
+                break
+            offset += 10
+            if descriptor[8] & 0x80:
+                offset += 3 * (1 << ((descriptor[8] & 0x07) + 1))
+            offset += 1  # LZW 最小码长
+            offset = _skip_gif_sub_blocks(reader, offset)
+        elif block[0] == 0x21:  # 扩展块
+            offset = _skip_gif_sub_blocks(reader, offset + 2)
+        else:
+            break
+        if offset < 0:
+            break
+    info.frames = max(1, info.frames)
+    return info
+
+
+def _inspect_webp(reader) -> MediaInfo:
+    info = MediaInfo(format="webp")
+    chunk = reader.read(12, 18)
+    if len(chunk) < 8:
+        return info
+    fourcc = chunk[:4]
+    if fourcc == b"VP8 " and len(chunk) >= 18:
+        width, height = struct.unpack("<HH", chunk[14:18])
+        info.width, info.height = width & 0x3FFF, height & 0x3FFF
+    elif fourcc == b"VP8L" and len(chunk) >= 13:
+        b0, b1, b2, b3 = chunk[9:13]
+        info.width = 1 + (b0 | (b1 & 0x3F) << 8)
+        info.height = 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+    elif fourcc == b"VP8X" and len(chunk) >= 18:
+        flags = chunk[8]
+        info.width = 1 + int.from_bytes(chunk[12:15], "little")
+        info.height = 1 + int.from_bytes(chunk[15:18], "little")
+        if flags & 0x02:  # 动画标志，逐个统计 ANMF 块
+            frames = 0
+            offset = 12
+            for _ in range(MAX_WALK_STEPS):
+                header = reader.read(offset, 8)
+                if len(header) < 8:
+                    break
+                chunk_type, size = struct.unpack("<4sI", header)
+                if chunk_type == b"ANMF":
+                    frames += 1
+                offset += 8 + size + (size & 1)
+            info.frames = max(1, frames)
+    return info
+
+
+def _inspect(reader) -> MediaInfo:
+    head = reader.read(0, 12)
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _inspect_png(reader)
+    if head.startswith(b"\xff\xd8"):
+        return _inspect_jpeg(reader)
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return _inspect_gif(reader)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _inspect_webp(reader)
+    return MediaInfo()
+
+
+def inspect_base64(data: str) -> MediaInfo:
+    """
+    识别 Base64 编码的图片，只解码文件头等必要部分
+    Parameters:
+        data: str: Base64编码的图片数据
+    Returns:
+        MediaInfo: 图片信息，无法识别时 format 为 None
+    """
+    try:
+        return _inspect(_Base64Reader(data))
+    except (binascii.Error, ValueError, struct.error):
+        return MediaInfo()
+
+
+def inspect_bytes(data: Union[bytes, bytearray, memoryview]) -> MediaInfo:
+    """
+    识别字节形式的图片
+    Parameters:
+        data: bytes: 图片数据
+    Returns:
+        MediaInfo: 图片信息，无法识别时 format 为 None
+    """
+    try:
+        return _inspect(_BytesReader(data))
+    except (ValueError, struct.error):
+        return MediaInfo()
@@ -0,0 +1,163 @@
+"""
+出站大媒体的文件中转
+当 Milky 与适配器位于同一主机或共享存储卷时，将较大的图片/语音写入共享目录并以 file:// URI 发送，
+避免在 JSON 请求体中内联数 MB 的 Base64；文件按引用计数在发送完成后删除
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import global_config
+from .logger import logger
+from .stats import register_stats_provider
+
+SPOOL_FILE_SUFFIXES = ("", ".png", ".jpeg", ".gif", ".webp")
+"""中转文件的后缀，与 send_handler.image_suffix 可能的取值一致"""
+
+SPOOL_FILE_RE = re.compile(
+    r"^[0-9a-f]{64}(?:%s)(?:\.tmp)?$" % "|".join(re.escape(suffix) for suffix in SPOOL_FILE_SUFFIXES)
+)
+"""中转文件名：内容 Base64 的 sha256 + 媒体后缀，写入中的临时文件带 .tmp"""
+
+
+def _write_file(path: str, encoded: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(base64.b64decode(encoded))
+    os.replace(tmp_path, path)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _clean_spool_dir(spool_dir: str) -> None:
+    """只删除符合中转文件命名的文件，目录被配置为与其他数据共用时不会误删"""
+    os.makedirs(spool_dir, exist_ok=True)
+    for name in os.listdir(spool_dir):
+        if SPOOL_FILE_RE.match(name):
+            _remove_file(os.path.join(spool_dir, name))
+
+
+class SpoolLease:
+    """一次发送中使用的中转文件，发送完成后调用 release 归还"""
+
+    def __init__(self, spool: "MediaSpool"):
+        self._spool = spool
+        self._names: List[str] = []
+
+    async def spool_base64(self, encoded: str, suffix: str = "", force: bool = False) -> Optional[str]:
+        """
+        媒体超过阈值时写入中转目录
+        Parameters:
+            encoded: str: Base64编码的媒体数据
+            suffix: str: 文件后缀
+            force: bool: 忽略大小阈值
+        Returns:
+            str | None: 文件的 file:// URI，未启用或未达到阈值时返回 None
+        """
+        if not self._spool.should_spool(encoded, force):
+            return None
+        name = f"{hashlib.sha256(encoded.encode('ascii')).hexdigest()}{suffix}"
+        uri = await self._spool.acquire(name, encoded)
+        self._names.append(name)
+        return uri
+
+    async def release(self) -> None:
+        names, self._names = self._names, []
+        for name in names:
+            await self._spool.release(name)
+
+
+class MediaSpool:
+    def __init__(self):
+        self._refs: Dict[str, int] = {}
+        self._writes: Dict[str, asyncio.Future] = {}
+        self._removals: Dict[str, asyncio.Future] = {}
+        """文件名 -> 进行中的删除，重新写入同名文件前需要等待其完成"""
+        self.stats: Dict[str, int] = {"spooled": 0, "reused": 0, "bytes": 0, "failures": 0}
+        self._prepared: Optional[asyncio.Future] = None
+
+    @property
+    def spool_dir(self) -> str:
+        return os.path.abspath(global_config.media.spool_dir)
+
+    async def _prepare(self) -> None:
+        """首次使用时创建目录并清理上次运行残留的中转文件"""
+        if self._prepared is None:
+            self._prepared = asyncio.ensure_future(asyncio.to_thread(_clean_spool_dir, self.spool_dir))
+        try:
+            await asyncio.shield(self._prepared)
+        except Exception:
+            self._prepared = None  # 下次使用时重试
+            raise
+
+    def should_spool(self, encoded: str, force: bool = False) -> bool:
+        if not global_config.media.spool_enabled or not encoded:
+            return False
+        return force or len(encoded) * 3 // 4 >= global_config.media.spool_threshold_kb * 1024
+
+    def uri_for(self, name: str) -> str:
+        """Milky 侧可访问的文件 URI"""
+        uri_dir = global_config.media.spool_uri_dir
+        if not uri_dir:
+            return Path(self.spool_dir, name).as_uri()
+        return f"file://{uri_dir.rstrip('/')}/{name}"
+
+    def lease(self) -> SpoolLease:
+        return SpoolLease(self)
+
+    async def acquire(self, name: str, encoded: str) -> str:
+        await self._prepare()
+        self._refs[name] = self._refs.get(name, 0) + 1
+        removal = self._removals.get(name)
+        if removal is not None:
+            # 同名文件正在被删除，等删除完成后再重新写入，避免刚写入的文件被删掉
+            await asyncio.shield(removal)
+        write_task = self._writes.get(name)
+        if write_task is None:
+            write_task = asyncio.ensure_future(asyncio.to_thread(_write_file, os.path.join(self.spool_dir, name), encoded))
+            self._writes[name] = write_task
+            self.stats["spooled"] += 1
+            self.stats["bytes"] += len(encoded) * 3 // 4
+        else:
+            self.stats["reused"] += 1
+        try:
+            await asyncio.shield(write_task)
+        except Exception as e:
+            self.stats["failures"] += 1
+            await self.release(name)
+            logger.error(f"写入中转文件失败: {e}")
+            raise
+        return self.uri_for(name)
+
+    async def release(self, name: str) -> None:
+        refs = self._refs.get(name, 0) - 1
+        if refs > 0:
+            self._refs[name] = refs
+            return
+        self._refs.pop(name, None)
+        removal = asyncio.ensure_future(self._remove(name, self._writes.pop(name, None)))
+        self._removals[name] = removal
+        removal.add_done_callback(lambda _: self._removals.pop(name, None))
+        await asyncio.shield(removal)
+
+    async def _remove(self, name: str, write_task: Optional[asyncio.Future]) -> None:
+        if write_task is not None and not write_task.done():
+            await asyncio.wait([write_task])
+        await asyncio.to_thread(_remove_file, os.path.join(self.spool_dir, name))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "active_files": len(self._refs)}
+
+
+media_spool = MediaSpool()
+register_stats_provider("media_spool", media_spool.get_stats)
@@ -1,25 +1,69 @@
 import aiohttp
 import asyncio
-import json
 import websockets
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Callable, List
 from .logger import logger
+from .log_format import redacted, truncate_text
 from .config import global_config
+from .config.official_configs import MilkyServerConfig
+from .stats import register_stats_provider
+from . import json_codec
+from .milky_events import EventDecodeError, MilkyEvent, decode_event
+
+# 只读、幂等的 API，相同参数的并发调用可以合并为一次请求
+IDEMPOTENT_ACTIONS = frozenset(
+    {
+        "get_login_info",
+        "get_impl_info",
+        "get_user_profile",
+        "get_friend_list",
+        "get_friend_info",
+        "get_group_list",
+        "get_group_info",
+        "get_group_member_list",
+        "get_group_member_info",
+        "get_message",
+        "get_record",
+        "get_resource_temp_url",
+    }
+)
 
 
 class MilkyComLayer:
     """Milky 通信层，处理 HTTP 请求和事件推送"""
     
     def __init__(self):
-        self.base_url: str = f"http://{global_config.milky_server.host}:{global_config.milky_server.port}"
-        self.ws_base_url: str = f"ws://{global_config.milky_server.host}:{global_config.milky_server.port}"
-        self.event_endpoint: str = global_config.milky_server.event_endpoint
-        self.api_endpoint: str = global_config.milky_server.api_endpoint
+        self._apply_server_config(global_config.milky_server)
         self.session: Optional[aiohttp.ClientSession] = None
         self.websocket: Optional[websockets.WebSocketServerProtocol] = None
         self.event_handlers: Dict[str, Callable] = {}
+        self.event_listeners: Dict[str, List[Callable]] = {}
         self.is_running: bool = False
+        self._inflight_requests: Dict[tuple, asyncio.Task] = {}
+        self.coalesce_stats: Dict[str, int] = {"requests": 0, "collapsed": 0}
         
+    def _apply_server_config(self, server_config: MilkyServerConfig) -> None:
+        self.base_url: str = f"http://{server_config.host}:{server_config.port}"
+        self.ws_base_url: str = f"ws://{server_config.host}:{server_config.port}"
+        self.event_endpoint: str = server_config.event_endpoint
+        self.api_endpoint: str = server_config.api_endpoint
+
+    async def on_config_reload(self, old_config, new_config) -> None:
+        """Milky 服务端配置变化时更新地址，只有 WebSocket 地址或令牌变化才重连"""
+        old_server, new_server = old_config.milky_server, new_config.milky_server
+        if old_server == new_server:
+            return
+        self._apply_server_config(new_server)
+        logger.info(f"Milky 服务端配置已更新: {self.base_url}")
+        if (old_server.host, old_server.port, old_server.event_endpoint, old_server.access_token) != (
+            new_server.host,
+            new_server.port,
+            new_server.event_endpoint,
+            new_server.access_token,
+        ) and self.websocket:
+            logger.info("Milky WebSocket 连接参数已变化，正在重连...")
+            await self.websocket.close()
+
     async def start(self):
         """启动 Milky 通信层"""
         if self.is_running:
@@ -70,13 +114,16 @@ class MilkyComLayer:
                             break
                             
                         try:
-                            # 解析 JSON 事件数据
-                            event_data = json.loads(message)
-                            logger.debug(f"收到 Milky 事件: {event_data.get('event_type', 'unknown')}")
-                            logger.debug(f"完整的事件数据: {event_data}")
-                            await self._handle_event(event_data)
-                        except json.JSONDecodeError as e:
-                            logger.error(f"解析事件数据失败: {e}, 原始数据: {message}")
+                            # 解析并解码为类型化事件，原始帧随事件一起传递，转发给MaiBot时无需重新序列化
+                            event_data = json_codec.loads(message)
+                            event = decode_event(event_data, message)
+                            logger.debug("收到 Milky 事件: {}, 事件数据: {}", event.event_type, redacted(event.data))
+                            await self._handle_event(event)
+                        except EventDecodeError as e:
+                            event_type = event_data.get("event_type") if isinstance(event_data, dict) else None
+                            logger.error("事件 {} 结构无效: {}, 原始数据: {}", event_type, e, truncate_text(message))
+                        except json_codec.JSONDecodeError as e:
+                            logger.error("解析事件数据失败: {}, 原始数据: {}", e, truncate_text(message))
                         except Exception as e:
                             logger.error(f"处理事件时发生错误: {e}")
                             
@@ -95,29 +142,37 @@ class MilkyComLayer:
                 logger.info("等待 5 秒后重连 Milky WebSocket...")
                 await asyncio.sleep(5)
             
-    async def _handle_event(self, event_data: Dict[str, Any]):
+    async def _handle_event(self, event: MilkyEvent):
         """处理接收到的事件"""
-        event_type = event_data.get("event_type")
-        logger.debug(f"处理事件类型: {event_type}")
-        logger.debug(f"事件数据结构: {event_data}")
-        
+        event_type = event.event_type
+
         if event_type:
+            for listener in self.event_listeners.get(event_type, []):
+                try:
+                    await listener(event)
+                except Exception as e:
+                    logger.error(f"执行事件监听器 {event_type} 时发生错误: {e}")
             handler = self.event_handlers.get(event_type)
             if handler:
                 try:
-                    logger.debug(f"调用事件处理器: {event_type}")
-                    await handler(event_data)
+                    logger.debug("调用事件处理器: {}", event_type)
+                    await handler(event)
                 except Exception as e:
                     logger.error(f"执行事件处理器 {event_type} 时发生错误: {e}")
             else:
-                logger.debug(f"未找到事件类型 {event_type} 的处理器")
+                logger.debug("未找到事件类型 {} 的处理器", event_type)
         else:
-            logger.warning(f"事件数据缺少 event_type 字段: {event_data}")
+            logger.warning(f"事件数据缺少 event_type 字段: {event}")
             
     def register_event_handler(self, event_type: str, handler: Callable):
-        """注册事件处理器"""
+        """注册事件处理器，处理器接收解码后的 MilkyEvent"""
         self.event_handlers[event_type] = handler
         logger.debug(f"注册事件处理器: {event_type}")
+
+    def add_event_listener(self, event_type: str, listener: Callable):
+        """添加事件监听器，监听器在事件处理器之前执行，同一事件可以有多个监听器"""
+        self.event_listeners.setdefault(event_type, []).append(listener)
+        logger.debug(f"添加事件监听器: {event_type}")
         
     async def call_api(self, action: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """调用 Milky API
@@ -135,7 +190,26 @@ class MilkyComLayer:
         # 确保参数不为 None，即使没有参数也要发送空字典
         if params is None:
             params = {}
-            
+
+        if action not in IDEMPOTENT_ACTIONS:
+            return await self._request_api(action, params)
+
+        # 相同 (action, 参数) 的并发调用共享同一次 HTTP 请求
+        key = (action, json_codec.dumps_bytes(params, sort_keys=True))
+        task = self._inflight_requests.get(key)
+        if task is None:
+            self.coalesce_stats["requests"] += 1
+            task = asyncio.create_task(self._request_api(action, params))
+            self._inflight_requests[key] = task
+            task.add_done_callback(lambda _: self._inflight_requests.pop(key, None))
+        else:
+            self.coalesce_stats["collapsed"] += 1
+            logger.debug("合并重复的 API 调用: {}", action)
+        # shield 保证单个调用方被取消时不影响其他共享该请求的调用方
+        return await asyncio.shield(task)
+
+    async def _request_api(self, action: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """实际发送 API 请求"""
         try:
             # 构建 API 端点：/api/{action}
             api_url = f"{self.base_url}/api/{action}"
@@ -149,18 +223,22 @@ class MilkyComLayer:
             if hasattr(global_config.milky_server, 'access_token') and global_config.milky_server.access_token:
                 headers["Authorization"] = f"Bearer {global_config.milky_server.access_token}"
             
-            logger.debug(f"调用 Milky API: {action}, 参数: {params}")
-            
-            async with self.session.post(api_url, json=params, headers=headers) as response:
-                response_text = await response.text()
-                
+            logger.debug("调用 Milky API: {}, 参数: {}", action, redacted(params))
+
+            # 预先编码请求体，直接以 bytes 发送；响应同样直接从 bytes 解码
+            body = json_codec.dumps_bytes(params)
+            async with self.session.post(api_url, data=body, headers=headers) as response:
+                response_body = await response.read()
+                response_text = response_body.decode("utf-8", errors="replace") if response.status != 200 else ""
+
                 if response.status == 200:
                     try:
-                        result = json.loads(response_text)
-                        logger.debug(f"API 调用成功: {action}, 响应: {result}")
+                        result = json_codec.loads(response_body)
+                        logger.debug("API 调用成功: {}, 响应: {}", action, redacted(result))
                         return result
-                    except json.JSONDecodeError as e:
-                        logger.error(f"API 响应解析失败: {action}, 响应文本: {response_text}, 错误: {e}")
+                    except json_codec.JSONDecodeError as e:
+                        response_text = response_body.decode("utf-8", errors="replace")
+                        logger.error("API 响应解析失败: {}, 响应文本: {}, 错误: {}", action, truncate_text(response_text), e)
                         return {
                             "status": "failed",
                             "retcode": -500,
@@ -192,11 +270,11 @@ class MilkyComLayer:
                     }
                     
                 else:
-                    logger.error(f"API 调用失败: {action}, 状态码: {response.status}, 响应: {response_text}")
+                    logger.error("API 调用失败: {}, 状态码: {}, 响应: {}", action, response.status, truncate_text(response_text))
                     return {
                         "status": "failed",
                         "retcode": -response.status,
-                        "message": f"HTTP {response.status}: {response_text}"
+                        "message": f"HTTP {response.status}: {truncate_text(response_text)}"
                     }
                     
         except Exception as e:
@@ -315,6 +393,10 @@ class MilkyComLayer:
 
 # 全局实例
 milky_com = MilkyComLayer()
+global_config.subscribe(milky_com.on_config_reload)
+register_stats_provider(
+    "milky_api", lambda: {**milky_com.coalesce_stats, "inflight": len(milky_com._inflight_requests)}
+)
 
 
 async def milky_start_com():
@@ -0,0 +1,333 @@
+"""
+Milky 事件的类型化模型
+事件在 WebSocket 入口处解码一次，字段的类型转换与默认值都由这里的 schema 负责，
+后续的分发器、缓存监听器和各处理器直接访问属性，不再逐层 .get()
+"""
+
+import dataclasses
+import time
+import typing
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from . import json_codec
+
+
+class EventDecodeError(ValueError):
+    """事件结构不符合 schema"""
+
+
+@dataclass(slots=True)
+class FriendEntity:
+    user_id: int = 0
+    nickname: str = ""
+    sex: str = "unknown"
+    qid: str = ""
+    remark: str = ""
+
+
+@dataclass(slots=True)
+class GroupEntity:
+    group_id: int = 0
+    group_name: str = ""
+    member_count: int = 0
+    max_member_count: int = 0
+
+
+@dataclass(slots=True)
+class GroupMemberEntity:
+    user_id: int = 0
+    group_id: int = 0
+    nickname: str = ""
+    card: str = ""
+    title: str = ""
+    sex: str = "unknown"
+    level: int = 0
+    role: str = "member"
+    join_time: int = 0
+    last_sent_time: int = 0
+    shut_up_end_time: int = 0
+
+
+@dataclass(slots=True)
+class IncomingMessage:
+    """message_receive"""
+
+    message_scene: str = ""
+    """friend / group / temp"""
+
+    peer_id: int = 0
+    """好友QQ号或群号"""
+
+    message_seq: int = 0
+    sender_id: int = 0
+    time: int = 0
+    segments: List[dict] = field(default_factory=list)
+    """消息段，保持 Milky 原始结构，由消息处理器按类型解析"""
+
+    friend: Optional[FriendEntity] = None
+    """好友消息时存在"""
+
+    group: Optional[GroupEntity] = None
+    """群消息与临时会话时存在"""
+
+    group_member: Optional[GroupMemberEntity] = None
+    """群消息时存在"""
+
+    @property
+    def group_id(self) -> Optional[int]:
+        return self.peer_id if self.message_scene in ("group", "temp") else None
+
+    def mentions(self, user_id: int) -> bool:
+        """消息中是否 @ 了指定用户"""
+        for segment in self.segments:
+            if segment.get("type") in ("mention", "at"):
+                data = segment.get("data") or {}
+                if str(data.get("user_id") or data.get("qq")) == str(user_id):
+                    return True
+        return False
+
+
+@dataclass(slots=True)
+class MessageRecallEvent:
+    message_scene: str = ""
+    peer_id: int = 0
+    message_seq: int = 0
+    sender_id: int = 0
+    operator_id: int = 0
+    display_suffix: str = ""
+
+
+@dataclass(slots=True)
+class FriendNudgeEvent:
+    user_id: int = 0
+    is_self_send: bool = False
+    is_self_receive: bool = False
+    display_action: str = ""
+    display_suffix: str = ""
+
+
+@dataclass(slots=True)
+class GroupNudgeEvent:
+    group_id: int = 0
+    sender_id: int = 0
+    receiver_id: int = 0
+    display_action: str = ""
+    display_suffix: str = ""
+
+
+@dataclass(slots=True)
+class GroupMuteEvent:
+    group_id: int = 0
+    user_id: int = 0
+    operator_id: int = 0
+    duration: int = 0
+    """禁言时长（秒），为 0 表示解除禁言"""
+
+
+@dataclass(slots=True)
+class GroupWholeMuteEvent:
+    group_id: int = 0
+    operator_id: int = 0
+    is_mute: bool = False
+
+
+@dataclass(slots=True)
+class GroupMemberIncreaseEvent:
+    group_id: int = 0
+    user_id: int = 0
+    operator_id: int = 0
+    invitor_id: int = 0
+
+
+@dataclass(slots=True)
+class GroupMemberDecreaseEvent:
+    group_id: int = 0
+    user_id: int = 0
+    operator_id: int = 0
+
+
+@dataclass(slots=True)
+class GroupAdminChangeEvent:
+    group_id: int = 0
+    user_id: int = 0
+    is_set: bool = False
+
+
+@dataclass(slots=True)
+class GroupNameChangeEvent:
+    group_id: int = 0
+    new_group_name: str = ""
+    operator_id: int = 0
+
+
+@dataclass(slots=True)
+class FriendRequestEvent:
+    initiator_id: int = 0
+    initiator_uid: str = ""
+    comment: str = ""
+    via: str = ""
+
+
+@dataclass(slots=True)
+class GroupJoinRequestEvent:
+    group_id: int = 0
+    notification_seq: int = 0
+    is_filtered: bool = False
+    initiator_id: int = 0
+    comment: str = ""
+
+
+@dataclass(slots=True)
+class GroupInvitedJoinRequestEvent:
+    group_id: int = 0
+    notification_seq: int = 0
+    initiator_id: int = 0
+    target_user_id: int = 0
+
+
+@dataclass(slots=True)
+class GroupInvitationEvent:
+    group_id: int = 0
+    invitation_seq: int = 0
+    initiator_id: int = 0
+
+
+@dataclass(slots=True)
+class BotOfflineEvent:
+    reason: str = ""
+
+
+EVENT_MODELS: Dict[str, type] = {
+    "message_receive": IncomingMessage,
+    "message_recall": MessageRecallEvent,
+    "friend_nudge": FriendNudgeEvent,
+    "group_nudge": GroupNudgeEvent,
+    "group_mute": GroupMuteEvent,
+    "group_whole_mute": GroupWholeMuteEvent,
+    "group_member_increase": GroupMemberIncreaseEvent,
+    "group_member_decrease": GroupMemberDecreaseEvent,
+    "group_admin_change": GroupAdminChangeEvent,
+    "group_name_change": GroupNameChangeEvent,
+    "friend_request": FriendRequestEvent,
+    "group_join_request": GroupJoinRequestEvent,
+    "group_invited_join_request": GroupInvitedJoinRequestEvent,
+    "group_invitation": GroupInvitationEvent,
+    "bot_offline": BotOfflineEvent,
+}
+"""事件类型 -> data 字段的模型，未列出的事件类型保留原始 dict"""
+
+POST_TYPES: Dict[str, str] = {"message_receive": "message", "bot_offline": "meta_event"}
+"""事件类型 -> 内部处理分类，未列出的均为 notice"""
+
+
+@dataclass(slots=True)
+class MilkyEvent:
+    event_type: str = ""
+    time: int = 0
+    self_id: int = 0
+    data: Any = None
+    """EVENT_MODELS 中对应的模型实例，未知事件类型为原始 dict"""
+
+    raw: Union[str, bytes, None] = None
+    """WebSocket 原始帧，用于生成 raw_message 时免去重新序列化"""
+
+    received_at: float = 0.0
+    """收到事件时的 time.monotonic()，用于统计处理延迟"""
+
+    matched_keyword: Optional[str] = None
+    """预过滤命中的昵称/关键词"""
+
+    repeat_count: int = 0
+    """复读折叠：此消息代表的、被折叠掉的重复消息条数"""
+
+    @property
+    def post_type(self) -> str:
+        return POST_TYPES.get(self.event_type, "notice")
+
+    def to_dict(self) -> dict:
+        """还原为 Milky 事件结构"""
+        data = dataclasses.asdict(self.data) if dataclasses.is_dataclass(self.data) else self.data
+        return {"time": self.time, "self_id": self.self_id, "event_type": self.event_type, "data": data}
+
+    def to_raw_message(self) -> str:
+        """生成 MessageBase.raw_message 的 JSON 字符串"""
+        event_json = self.raw if self.raw is not None else json_codec.dumps(self.to_dict())
+        return json_codec.dumps_event(self.post_type, event_json)
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if typing.get_origin(annotation) is Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+# 模型 -> ((字段名, 目标类型), ...)，首次解码时按类型注解生成
+_SCHEMAS: Dict[type, Tuple[Tuple[str, Any], ...]] = {}
+
+
+def _schema(model: type) -> Tuple[Tuple[str, Any], ...]:
+    schema = _SCHEMAS.get(model)
+    if schema is None:
+        hints = typing.get_type_hints(model)
+        schema = tuple((f.name, _unwrap_optional(hints[f.name])) for f in dataclasses.fields(model))
+        _SCHEMAS[model] = schema
+    return schema
+
+
+def _decode_model(model: type, data: Any) -> Any:
+    if not isinstance(data, dict):
+        raise EventDecodeError(f"{model.__name__} 需要对象，实际为 {type(data).__name__}")
+    kwargs: Dict[str, Any] = {}
+    for name, target in _schema(model):
+        value = data.get(name)
+        if value is None:
+            continue  # 缺失的字段使用默认值
+        try:
+            if target is int:
+                value = int(value)
+            elif target is bool:
+                value = bool(value)
+            elif target is str:
+                value = value if isinstance(value, str) else str(value)
+            elif dataclasses.is_dataclass(target):
+                value = _decode_model(target, value)
+            elif typing.get_origin(target) is list and not isinstance(value, list):
+                raise EventDecodeError(f"{model.__name__}.{name} 需要数组")
+        except (TypeError, ValueError) as e:
+            raise EventDecodeError(f"{model.__name__}.{name} 字段无效: {e}") from e
+        kwargs[name] = value
+    return model(**kwargs)
+
+
+def decode_event(event_data: dict, raw: Union[str, bytes, None] = None) -> MilkyEvent:
+    """
+    将 Milky 推送的事件解码为类型化对象
+    Parameters:
+        event_data: dict: JSON 解码后的事件
+        raw: str | bytes | None: 事件的原始 JSON 文本
+    Returns:
+        MilkyEvent: 解码后的事件，结构无效时抛出 EventDecodeError
+    """
+    if not isinstance(event_data, dict):
+        raise EventDecodeError("事件需要是对象")
+    event_type = event_data.get("event_type")
+    if not event_type:
+        raise EventDecodeError("事件数据缺少 event_type 字段")
+    data = event_data.get("data")
+    model = EVENT_MODELS.get(event_type)
+    if model is not None:
+        data = _decode_model(model, data if data is not None else {})
+    try:
+        return MilkyEvent(
+            event_type=event_type,
+            time=int(event_data.get("time") or 0),
+            self_id=int(event_data.get("self_id") or 0),
+            data=data,
+            raw=raw,
+            received_at=time.monotonic(),
+        )
+    except (TypeError, ValueError) as e:
+        raise EventDecodeError(f"事件头字段无效: {e}") from e
@@ -1,19 +1,36 @@
 from maim_message import Router, RouteConfig, TargetConfig
 from .config import global_config
+from .config.official_configs import MaiBotServerConfig
 from .logger import logger, custom_logger
 from .send_handler import send_handler
 
-route_config = RouteConfig(
-    route_config={
-        global_config.maibot_server.platform_name: TargetConfig(
-            url=f"ws://{global_config.maibot_server.host}:{global_config.maibot_server.port}/ws",
-            token=None,
-        )
-    }
-)
+
+def build_route_config(maibot_server: MaiBotServerConfig) -> RouteConfig:
+    return RouteConfig(
+        route_config={
+            maibot_server.platform_name: TargetConfig(
+                url=f"ws://{maibot_server.host}:{maibot_server.port}/ws",
+                token=None,
+            )
+        }
+    )
+
+
+route_config = build_route_config(global_config.maibot_server)
 router = Router(route_config, custom_logger)
 
 
+async def on_config_reload(old_config, new_config) -> None:
+    """MaiBot 地址变化时由 Router 只重建对应平台的连接"""
+    if old_config.maibot_server == new_config.maibot_server:
+        return
+    logger.info(f"MaiBot 服务端配置已更新，正在重连 {new_config.maibot_server.host}:{new_config.maibot_server.port}")
+    await router.update_config(build_route_config(new_config.maibot_server).to_dict())
+
+
+global_config.subscribe(on_config_reload)
+
+
 async def mmc_start_com():
     logger.info("正在连接MaiBot")
     router.register_class_handler(send_handler.handle_message)
@@ -1,12 +1,20 @@
 from src.logger import logger
+from src.log_format import redacted
 from src.config import global_config
-from src.utils import get_image_base64,get_member_info, get_user_profile
+from src.utils import get_image_base64, get_member_info, get_user_profile, get_group_name, url_expires_within
+from src.directory_cache import directory_cache
+from src.access_policy import access_policy
+from src.media_cache import media_cache, image_identifier
+from src.image_transform import transform_cache_suffix, transform_inbound_image
+from src.media_budget import media_budget, MediaLedger
+from src.milky_events import IncomingMessage, MilkyEvent
 from .qq_emoji_list import qq_face
 from .message_sending import message_send_instance
 from . import RealMessageType, MessageType, ACCEPT_FORMAT
 
 import time
-import json
+import asyncio
+import dataclasses
 from typing import List, Tuple, Optional, Dict
 
 from maim_message import (
@@ -21,6 +29,14 @@ from maim_message import (
     ReceiverInfo,
 )
 
+PLAIN_IMAGE_SUB_TYPES = (0, "normal")
+"""普通图片的子类型：Milky 为 "normal"（表情包为 "sticker"），兼容 OneBot 风格的 0"""
+
+
+def is_plain_image(message_data: dict) -> bool:
+    """判断图片消息段是普通图片而不是表情包"""
+    return message_data.get("sub_type") in PLAIN_IMAGE_SUB_TYPES
+
 
 class MessageHandler:
     def __init__(self):
@@ -122,65 +138,25 @@ class MessageHandler:
         Returns:
             bool: 是否允许聊天
         """
-        logger.debug(f"群聊id: {group_id}, 用户id: {user_id}")
-        logger.debug("开始检查聊天白名单/黑名单")
-        if group_id:
-            if global_config.chat.group_list_type == "whitelist" and group_id not in global_config.chat.group_list:
-                logger.warning("群聊不在聊天白名单中，消息被丢弃")
-                return False
-            elif global_config.chat.group_list_type == "blacklist" and group_id in global_config.chat.group_list:
-                logger.warning("群聊在聊天黑名单中，消息被丢弃")
-                return False
-        else:
-            if global_config.chat.private_list_type == "whitelist" and user_id not in global_config.chat.private_list:
-                logger.warning("私聊不在聊天白名单中，消息被丢弃")
-                return False
-            elif global_config.chat.private_list_type == "blacklist" and user_id in global_config.chat.private_list:
-                logger.warning("私聊在聊天黑名单中，消息被丢弃")
-                return False
-        if user_id in global_config.chat.ban_user_id and not ignore_global_list:
-            logger.warning("用户在全局黑名单中，消息被丢弃")
+        reason = access_policy.check(user_id, group_id, ignore_global_list)
+        if reason is not None:
+            logger.debug("群聊id: {}, 用户id: {} 不允许聊天: {}", group_id, user_id, reason)
             return False
-
         # 暂时跳过机器人检查，因为 Milky 可能不提供这个信息
         # TODO: 实现 Milky 的机器人检查逻辑
-
         return True
 
-    async def handle_raw_message(self, raw_message: dict) -> None:
+    async def handle_raw_message(self, event: MilkyEvent) -> None:
         """
-        从 Milky 接受的原始消息处理
+        从 Milky 接受的消息事件处理
 
         Parameters:
-            raw_message: dict: 原始消息
+            event: MilkyEvent: 解码后的 message_receive 事件
         """
-        # 添加详细日志，记录原始消息内容
-        logger.debug(f"收到原始消息: {raw_message}")
-        
-        # 从 Milky 事件中提取消息数据
-        event_data = raw_message.get("data", {})
-        logger.debug(f"提取的事件数据: {event_data}")
-        
-        # 直接提取内层 data 字段（Milky 数据结构必定嵌套）
-        actual_message_data = event_data.get("data", {})
-        logger.debug(f"提取内层消息数据: {actual_message_data}")
-        
-        # 判断消息类型
-        message_scene = actual_message_data.get("message_scene")
-        logger.debug(f"消息场景: {message_scene}")
-        
-        # 如果 message_scene 为空，尝试从其他字段推断
-        if not message_scene:
-            if "group" in actual_message_data:
-                message_scene = "group"
-                logger.debug(f"从 group 字段推断消息场景为: {message_scene}")
-            elif "friend" in actual_message_data:
-                message_scene = "friend"
-                logger.debug(f"从 friend 字段推断消息场景为: {message_scene}")
-            elif "temp" in actual_message_data:
-                message_scene = "temp"
-                logger.debug(f"从 temp 字段推断消息场景为: {message_scene}")
-        
+        message: IncomingMessage = event.data
+        logger.debug("收到消息: scene={}, peer_id={}, seq={}", message.message_scene, message.peer_id, message.message_seq)
+
+        message_scene = message.message_scene
         if message_scene == "friend":
             message_type = MessageType.private
             sub_type = MessageType.Private.friend
@@ -188,39 +164,38 @@ class MessageHandler:
         elif message_scene == "group":
             message_type = MessageType.group
             sub_type = MessageType.Group.normal
-            group_id = actual_message_data.get("peer_id")
+            group_id = message.peer_id
         elif message_scene == "temp":
             message_type = MessageType.private
             sub_type = MessageType.Private.group
-            group_id = actual_message_data.get("peer_id")
+            group_id = message.peer_id
         else:
             logger.warning(f"不支持的消息场景: {message_scene}")
-            logger.debug(f"完整的事件数据结构: {actual_message_data}")
-            logger.debug(f"可用的键: {list(actual_message_data.keys())}")
             return None
 
         # 获取消息信息
-        message_seq = actual_message_data.get("message_seq")
-        message_time = actual_message_data.get("time", time.time())
-        
-        # 获取发送者信息 - 修复数据结构解析问题
-        # 尝试从不同字段获取发送者信息
-        user_id = None
+        message_seq = message.message_seq
+        message_time = message.time or time.time()
+
+        # 获取发送者信息
+        user_id = message.sender_id
         user_nickname = ""
         user_cardname = ""
-        
-        # 优先从 group_member 获取（群聊消息）
-        if "group_member" in actual_message_data:
-            group_member = actual_message_data.get("group_member", {})
-            user_id = group_member.get("user_id")
-            user_nickname = group_member.get("nickname", "")
-            user_cardname = group_member.get("card", "")
-            logger.debug(f"从 group_member 获取发送者信息: user_id={user_id}, nickname={user_nickname}, card={user_cardname}")
-        # 从 sender_id 获取（所有消息类型都有）
-        elif "sender_id" in actual_message_data:
-            user_id = actual_message_data.get("sender_id")
-            logger.debug(f"从 sender_id 获取发送者ID: {user_id}")
-            
+
+        if message.group_member is not None:
+            # 群消息自带发送者的群成员信息
+            group_member = message.group_member
+            user_id = group_member.user_id or user_id
+            user_nickname = group_member.nickname
+            user_cardname = group_member.card
+            logger.debug("从 group_member 获取发送者信息: user_id={}, nickname={}, card={}", user_id, user_nickname, user_cardname)
+            # 事件自带的成员信息是最新的，顺便刷新缓存
+            directory_cache.prime_member(group_id, dataclasses.asdict(group_member))
+        elif message.friend is not None and message.friend.nickname:
+            # 好友消息自带好友信息
+            user_nickname = message.friend.nickname
+            user_cardname = message.friend.remark or message.friend.nickname
+        elif user_id:
             # 对于私聊消息或没有group_member的消息，调用API获取用户信息
             if message_type == MessageType.private or not group_id:
                 try:
@@ -246,6 +221,7 @@ class MessageHandler:
                     member_info_result = await get_member_info(group_id, user_id)
                     if member_info_result.get("status") == "ok":
                         member_data = member_info_result.get("data", {})
+                        member_data = member_data.get("member", member_data)
                         user_nickname = member_data.get("nickname", f"用户{user_id}")
                         user_cardname = member_data.get("card", f"用户{user_id}")
                         logger.debug(f"通过API获取到群成员信息: nickname={user_nickname}, card={user_cardname}")
@@ -263,6 +239,7 @@ class MessageHandler:
             logger.warning("无法获取发送者ID，跳过消息处理")
             return None
 
+        group_name: str = ""
         template_info: TemplateInfo = None  # 模板信息，暂时为空，等待启用
         format_info: FormatInfo = FormatInfo(
             content_format=["text", "image", "emoji", "voice"],
@@ -271,9 +248,7 @@ class MessageHandler:
 
         if message_type == MessageType.private:
             if sub_type == MessageType.Private.friend:
-                if not await self.check_allow_to_chat(user_id, None):
-                    return None
-
+                # 黑白名单已在入口由 access_policy 判定
                 # 发送者用户信息
                 user_info: UserInfo = UserInfo(
                     platform=global_config.maibot_server.platform_name,
@@ -292,9 +267,7 @@ class MessageHandler:
                 return None
         elif message_type == MessageType.group:
             if sub_type == MessageType.Group.normal:
-                if not await self.check_allow_to_chat(user_id, group_id):
-                    return None
-
+                # 黑白名单已在入口由 access_policy 判定
                 # 发送者用户信息
                 user_info: UserInfo = UserInfo(
                     platform=global_config.maibot_server.platform_name,
@@ -304,11 +277,12 @@ class MessageHandler:
                 )
 
                 # 群聊信息
-                group_name = ""
-                if "group" in actual_message_data:
-                    group_data = actual_message_data.get("group", {})
-                    group_name = group_data.get("name", "")
-                    logger.debug(f"从 group 字段获取群名称: {group_name}")
+                if message.group is not None:
+                    group_name = message.group.group_name
+                    directory_cache.prime_group(dataclasses.asdict(message.group))
+                    logger.debug("从 group 字段获取群名称: {}", group_name)
+                if not group_name:
+                    group_name = await get_group_name(group_id)
                 
                 group_info: GroupInfo = GroupInfo(
                     platform=global_config.maibot_server.platform_name,
@@ -322,6 +296,8 @@ class MessageHandler:
         additional_config: dict = {}
         if global_config.voice.use_tts:
             additional_config["allow_tts"] = True
+        if event.repeat_count:
+            additional_config["repeat_count"] = event.repeat_count
 
         # 创建发送者信息
         sender_info = self._create_sender_info(
@@ -335,7 +311,7 @@ class MessageHandler:
         # 创建接收者信息
         # 私聊时接收者是机器人，群聊时接收者是群
         receiver_info = self._create_receiver_info(
-            target_user_id=event_data.get("self_id") if message_type == MessageType.private else None,
+            target_user_id=event.self_id if message_type == MessageType.private else None,
             target_user_nickname="机器人" if message_type == MessageType.private else "",
             group_id=group_id,
             group_name=group_name,
@@ -356,25 +332,41 @@ class MessageHandler:
             receiver_info=receiver_info,
         )
 
-        # 处理实际信息 - 修复 Milky 数据结构匹配问题
-        # Milky 使用 segments 字段，而不是 message 字段
-        if not actual_message_data.get("segments"):
+        # 处理实际信息
+        if not message.segments:
             logger.warning("原始消息内容为空 (segments 字段不存在)")
             return None
 
+        # 消息中的媒体在发送给MaiBot之前一直占用内存预算
+        media_ledger = media_budget.ledger()
+        try:
+            await self.build_and_send(event, message_info, media_ledger)
+        finally:
+            media_ledger.release()
+
+    async def build_and_send(self, event: MilkyEvent, message_info: BaseMessageInfo, media_ledger: MediaLedger) -> None:
+        """
+        处理消息段并发送到MaiBot
+        Parameters:
+            event: MilkyEvent: 消息事件
+            message_info: BaseMessageInfo: 消息信息
+            media_ledger: MediaLedger: 本条消息的媒体内存记账
+        """
         # 获取Seg列表
-        seg_message: List[Seg] = await self.handle_real_message(actual_message_data)
+        seg_message: List[Seg] = await self.handle_real_message(event, media_ledger=media_ledger)
         if not seg_message:
             logger.warning("处理后消息内容为空")
             return None
+        if event.repeat_count:
+            # 复读折叠后的汇总消息
+            seg_message.append(Seg(type="text", data=f"（这条消息在群里又被重复发送了 {event.repeat_count} 次）"))
         submit_seg: Seg = Seg(
             type="seglist",
             data=seg_message,
         )
-        logger.debug(f"创建的 submit_seg: {submit_seg}")
         # MessageBase创建
         # 将 raw_message 转换为 JSON 字符串，因为 MessageBase 期望字符串类型
-        raw_message_str = json.dumps(raw_message, ensure_ascii=False) if raw_message else None
+        raw_message_str = event.to_raw_message()
         message_base: MessageBase = MessageBase(
             message_info=message_info,
             message_segment=submit_seg,
@@ -382,106 +374,122 @@ class MessageHandler:
         )
 
         logger.info("发送到Maibot处理信息")
-        logger.debug(f"MessageBase 内容: message_info={message_info}, message_segment={submit_seg}, raw_message={raw_message}")
+        logger.debug("MessageBase 内容: message_info={}, message_segment={}", redacted(message_info), redacted(submit_seg))
         await message_send_instance.message_send(message_base)
 
-    async def handle_real_message(self, event_data: dict, in_reply: bool = False) -> List[Seg] | None:
+    async def handle_real_message(
+        self, event: MilkyEvent, in_reply: bool = False, media_ledger: Optional[MediaLedger] = None
+    ) -> List[Seg] | None:
         """
         处理实际消息
+        各消息段的处理（图片下载等）并发进行，结果保持原有顺序
         Parameters:
-            event_data: dict: Milky 事件数据
+            event: MilkyEvent: 消息事件
+            in_reply: bool: 是否在处理被回复的消息
+            media_ledger: MediaLedger: 媒体内存记账，为 None 时不计入预算
         Returns:
             seg_message: list[Seg]: 处理后的消息段列表
         """
-        # 修复 Milky 数据结构匹配问题
-        # Milky 使用 segments 字段，而不是 message 字段
-        real_message: list = event_data.get("segments", [])
+        real_message: List[dict] = event.data.segments
         if not real_message:
             logger.warning("segments 字段为空")
             return None
+        logger.debug("开始处理 {} 个消息段", len(real_message))
+        semaphore = asyncio.Semaphore(max(1, global_config.worker.segment_concurrency))
+
+        async def handle_with_limit(sub_message: dict) -> Seg | List[Seg] | None:
+            async with semaphore:
+                return await self.handle_segment(sub_message, event, in_reply, media_ledger)
+
+        # 单个消息段失败不影响其他消息段
+        results = await asyncio.gather(*(handle_with_limit(m) for m in real_message), return_exceptions=True)
         seg_message: List[Seg] = []
-        logger.debug(f"开始处理 {len(real_message)} 个消息段")
-        for sub_message in real_message:
-            sub_message: dict
-            sub_message_type = sub_message.get("type")
-            logger.debug(f"处理消息段类型: {sub_message_type}, 内容: {sub_message}")
-            match sub_message_type:
-                case RealMessageType.text:
-                    ret_seg = await self.handle_text_message(sub_message)
-                    if ret_seg:
-                        seg_message.append(ret_seg)
-                        logger.debug(f"成功添加文本段: {ret_seg}")
-                    else:
-                        logger.warning("text处理失败")
-                case RealMessageType.face:
-                    ret_seg = await self.handle_face_message(sub_message)
-                    if ret_seg:
-                        seg_message.append(ret_seg)
-                    else:
-                        logger.warning("face处理失败或不支持")
-                case RealMessageType.reply:
-                    if not in_reply:
-                        ret_seg = await self.handle_reply_message(sub_message)
-                        if ret_seg:
-                            seg_message += ret_seg
-                        else:
-                            logger.warning("reply处理失败")
-                case RealMessageType.image:
-                    ret_seg = await self.handle_image_message(sub_message)
-                    if ret_seg:
-                        seg_message.append(ret_seg)
-                    else:
-                        logger.warning("image处理失败")
-                case RealMessageType.record:
-                    ret_seg = await self.handle_record_message(sub_message)
-                    if ret_seg:
-                        seg_message.clear()
-                        seg_message.append(ret_seg)
-                        break  # 使得消息只有record消息
-                    else:
-                        logger.warning("record处理失败或不支持")
-                case RealMessageType.video:
-                    logger.warning("不支持视频解析")
-                case RealMessageType.at:
-                    ret_seg = await self.handle_at_message(
-                        sub_message,
-                        event_data.get("self_id"),
-                        event_data.get("peer_id"),
-                    )
-                    if ret_seg:
-                        seg_message.append(ret_seg)
-                    else:
-                        logger.warning("at处理失败")
-                case RealMessageType.mention:
-                    # mention 类型等同于 at 类型，使用相同的处理方法
-                    ret_seg = await self.handle_at_message(
-                        sub_message,
-                        event_data.get("self_id"),
-                        event_data.get("peer_id"),
-                    )
-                    if ret_seg:
-                        seg_message.append(ret_seg)
-                        logger.debug(f"成功添加 mention 段: {ret_seg}")
-                    else:
-                        logger.warning("mention处理失败")
-                case RealMessageType.rps:
-                    logger.warning("暂时不支持猜拳魔法表情解析")
-                case RealMessageType.dice:
-                    logger.warning("暂时不支持骰子表情解析")
-                case RealMessageType.shake:
-                    # 预计等价于戳一戳
-                    logger.warning("暂时不支持窗口抖动解析")
-                case RealMessageType.share:
-                    logger.warning("暂时不支持链接解析")
-                case RealMessageType.forward:
-                    # Milky 可能不直接支持转发消息，暂时跳过
-                    logger.warning("暂时不支持转发消息解析")
-                case RealMessageType.node:
-                    logger.warning("不支持转发消息节点解析")
-                case _:
-                    logger.warning(f"未知消息类型: {sub_message_type}")
+        for sub_message, ret_seg in zip(real_message, results):
+            if isinstance(ret_seg, Exception):
+                logger.error(f"处理消息段 {sub_message.get('type')} 时发生错误: {ret_seg}")
+                continue
+            if not ret_seg:
+                continue
+            if sub_message.get("type") == RealMessageType.record:
+                return [ret_seg]  # 使得消息只有record消息
+            if isinstance(ret_seg, list):
+                seg_message += ret_seg
+            else:
+                seg_message.append(ret_seg)
         return seg_message
 
+    async def handle_segment(
+        self, sub_message: dict, event: MilkyEvent, in_reply: bool = False, media_ledger: Optional[MediaLedger] = None
+    ) -> Seg | List[Seg] | None:
+        """
+        处理单个消息段
+        Parameters:
+            sub_message: dict: 消息段
+            event: MilkyEvent: 消息所属的事件
+            in_reply: bool: 是否在处理被回复的消息
+            media_ledger: MediaLedger: 媒体内存记账
+        Returns:
+            Seg | List[Seg] | None: 处理后的消息段，reply 会返回列表
+        """
+        sub_message_type = sub_message.get("type")
+        logger.debug("处理消息段类型: {}, 内容: {}", sub_message_type, redacted(sub_message))
+        ret_seg: Seg | List[Seg] | None = None
+        match sub_message_type:
+            case RealMessageType.text:
+                ret_seg = await self.handle_text_message(sub_message)
+                if ret_seg:
+                    logger.debug("成功添加文本段: {}", redacted(ret_seg))
+                else:
+                    logger.warning("text处理失败")
+            case RealMessageType.face:
+                ret_seg = await self.handle_face_message(sub_message)
+                if not ret_seg:
+                    logger.warning("face处理失败或不支持")
+            case RealMessageType.reply:
+                if not in_reply:
+                    ret_seg = await self.handle_reply_message(sub_message)
+                    if not ret_seg:
+                        logger.warning("reply处理失败")
+            case RealMessageType.image:
+                group_id = event.data.peer_id if event.data.message_scene == "group" else None
+                ret_seg = await self.handle_image_message(sub_message, group_id, media_ledger)
+                if not ret_seg:
+                    logger.warning("image处理失败")
+            case RealMessageType.record:
+                ret_seg = await self.handle_record_message(sub_message, media_ledger)
+                if not ret_seg:
+                    logger.warning("record处理失败或不支持")
+            case RealMessageType.video:
+                logger.warning("不支持视频解析")
+            case RealMessageType.at | RealMessageType.mention:
+                # mention 类型等同于 at 类型，使用相同的处理方法
+                ret_seg = await self.handle_at_message(
+                    sub_message,
+                    event.self_id,
+                    event.data.peer_id,
+                )
+                if ret_seg:
+                    logger.debug("成功添加 {} 段: {}", sub_message_type, redacted(ret_seg))
+                else:
+                    logger.warning(f"{sub_message_type}处理失败")
+            case RealMessageType.rps:
+                logger.warning("暂时不支持猜拳魔法表情解析")
+            case RealMessageType.dice:
+                logger.warning("暂时不支持骰子表情解析")
+            case RealMessageType.shake:
+                # 预计等价于戳一戳
+                logger.warning("暂时不支持窗口抖动解析")
+            case RealMessageType.share:
+                logger.warning("暂时不支持链接解析")
+            case RealMessageType.forward:
+                # Milky 可能不直接支持转发消息，暂时跳过
+                logger.warning("暂时不支持转发消息解析")
+            case RealMessageType.node:
+                logger.warning("不支持转发消息节点解析")
+            case _:
+                logger.warning(f"未知消息类型: {sub_message_type}")
+        return ret_seg
+
     async def handle_text_message(self, raw_message: dict) -> Seg:
         """
         处理纯文本信息
@@ -492,9 +500,8 @@ class MessageHandler:
         """
         message_data: dict = raw_message.get("data")
         plain_text: str = message_data.get("text")
-        logger.debug(f"处理文本消息: {plain_text}")
         seg = Seg(type="text", data=plain_text)
-        logger.debug(f"创建的 Seg 对象: {seg}")
+        logger.debug("创建的 Seg 对象: {}", redacted(seg))
         return seg
 
     async def handle_face_message(self, raw_message: dict) -> Seg | None:
@@ -514,16 +521,35 @@ class MessageHandler:
             logger.warning(f"不支持的表情：{face_raw_id}")
             return None
 
-    async def handle_image_message(self, raw_message: dict) -> Seg | None:
+    def use_image_url(self, group_id: Optional[int]) -> bool:
+        """是否以链接形式转发图片"""
+        media_config = global_config.media
+        return media_config.image_url_mode == "url" or (group_id is not None and group_id in media_config.image_url_groups)
+
+    async def handle_image_message(
+        self, raw_message: dict, group_id: Optional[int] = None, media_ledger: Optional[MediaLedger] = None
+    ) -> Seg | None:
         """
         处理图片消息与表情包消息
         Parameters:
             raw_message: dict: 原始消息
+            group_id: int: 群号，私聊时为 None
+            media_ledger: MediaLedger: 媒体内存记账，预算已满时推迟下载
         Returns:
             seg_data: Seg: 处理后的消息段
         """
         message_data: dict = raw_message.get("data")
         image_sub_type = message_data.get("sub_type")
+        plain_image = is_plain_image(message_data)
+        if plain_image and not message_data.get("base64") and self.use_image_url(group_id):
+            # 链接模式下由 MaiBot 自行下载图片，链接缺失或即将过期时才回退为 Base64
+            image_url = message_data.get("temp_url") or message_data.get("url")
+            if image_url and not url_expires_within(image_url, global_config.media.image_url_min_ttl):
+                return Seg(type="imageurl", data=image_url)
+            logger.debug("图片链接缺失或即将过期，回退为Base64")
+        # 从 URL 获取时的缓存标识，以及是否命中缓存
+        image_key: Optional[str] = None
+        cached = False
         try:
             # Milky 可能直接提供 base64 数据
             image_base64 = message_data.get("base64")
@@ -532,8 +558,19 @@ class MessageHandler:
                 # Milky 使用 temp_url 字段，而不是 url 字段
                 image_url = message_data.get("temp_url") or message_data.get("url")
                 if image_url:
-                    logger.debug(f"从 URL 获取图片: {image_url}")
-                    image_base64 = await get_image_base64(image_url)
+                    if media_ledger is not None:
+                        await media_ledger.reserve()
+                    image_key = image_identifier(message_data)
+                    if image_key and plain_image:
+                        # 普通图片缓存的是缩放后的结果，命中时无需再次缩放
+                        image_key += transform_cache_suffix()
+                    image_base64 = await media_cache.get_base64(image_key) if image_key else None
+                    if image_base64:
+                        logger.debug("图片命中本地缓存: {}", image_key)
+                        cached = True
+                    else:
+                        logger.debug("从 URL 获取图片: {}", redacted(image_url))
+                        image_base64 = await get_image_base64(image_url)
                 else:
                     logger.warning("图片消息缺少文件信息 (temp_url 和 url 都不存在)")
                     logger.debug(f"可用的字段: {list(message_data.keys())}")
@@ -541,12 +578,23 @@ class MessageHandler:
         except Exception as e:
             logger.error(f"图片消息处理失败: {str(e)}")
             return None
-            
-        if image_sub_type == 0:
+        if media_ledger is not None and image_base64:
+            media_ledger.charge(len(image_base64))
+
+        if plain_image:
             """这部分认为是图片"""
+            if not cached:
+                transformed_base64 = await transform_inbound_image(image_base64)
+                if media_ledger is not None:
+                    media_ledger.charge(len(transformed_base64) - len(image_base64))
+                image_base64 = transformed_base64
+                if image_key:
+                    await media_cache.put_base64(image_key, image_base64)
             return Seg(type="image", data=image_base64)
         elif image_sub_type not in [4, 9]:
             """这部分认为是表情包"""
+            if image_key and not cached:
+                await media_cache.put_base64(image_key, image_base64)
             return Seg(type="emoji", data=image_base64)
         else:
             logger.warning(f"不支持的图片子类型：{image_sub_type}")
@@ -582,11 +630,12 @@ class MessageHandler:
             logger.warning("at/mention 消息缺少数据字段")
             return None
 
-    async def handle_record_message(self, raw_message: dict) -> Seg | None:
+    async def handle_record_message(self, raw_message: dict, media_ledger: Optional[MediaLedger] = None) -> Seg | None:
         """
         处理语音消息
         Parameters:
             raw_message: dict: 原始消息
+            media_ledger: MediaLedger: 媒体内存记账
         Returns:
             seg_data: Seg: 处理后的消息段
         """
@@ -611,6 +660,8 @@ class MessageHandler:
         if not audio_base64:
             logger.error("语音消息处理失败，未获取到音频数据")
             return None
+        if media_ledger is not None:
+            media_ledger.charge(len(audio_base64))
         return Seg(type="voice", data=audio_base64)
 
     async def handle_reply_message(self, raw_message: dict) -> List[Seg] | None:
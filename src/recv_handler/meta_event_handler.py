@@ -3,6 +3,7 @@ from src.config import global_config
 import time
 import asyncio
 
+from src.milky_events import BotOfflineEvent, MilkyEvent
 from . import MetaEventType
 
 
@@ -16,16 +17,11 @@ class MetaEventHandler:
         self._interval_checking = False
         self.last_heart_beat = time.time()
 
-    async def handle_meta_event(self, message: dict) -> None:
-        # 从 Milky 事件中提取元事件数据
-        event_data = message.get("data", {})
-        event_type = message.get("event_type")
-        
-        if event_type == "bot_offline":
+    async def handle_meta_event(self, event: MilkyEvent) -> None:
+        if isinstance(event.data, BotOfflineEvent):
             # 处理机器人离线事件
-            self_id = event_data.get("self_id")
-            reason = event_data.get("reason", "未知原因")
-            logger.warning(f"Bot {self_id} 离线，原因: {reason}")
+            reason = event.data.reason or "未知原因"
+            logger.warning(f"Bot {event.self_id} 离线，原因: {reason}")
             # 可以在这里添加重连逻辑
         else:
             # 其他事件类型，更新心跳时间
@@ -1,17 +1,32 @@
 import time
-import json
 import asyncio
 from typing import Tuple, Optional
 
 from src.logger import logger
 from src.config import global_config
+from src import json_codec
+from src.milky_events import (
+    FriendNudgeEvent,
+    FriendRequestEvent,
+    GroupAdminChangeEvent,
+    GroupInvitationEvent,
+    GroupInvitedJoinRequestEvent,
+    GroupJoinRequestEvent,
+    GroupMemberDecreaseEvent,
+    GroupMemberIncreaseEvent,
+    GroupMuteEvent,
+    GroupNudgeEvent,
+    GroupWholeMuteEvent,
+    MessageRecallEvent,
+    MilkyEvent,
+)
 from src.database import BanUser, db_manager, is_identical
 from . import NoticeType, ACCEPT_FORMAT
 from .message_sending import message_send_instance
 from .message_handler import message_handler
 from maim_message import FormatInfo, UserInfo, GroupInfo, Seg, BaseMessageInfo, MessageBase, SenderInfo, ReceiverInfo
 
-from src.utils import get_member_info
+from src.utils import get_member_info, get_group_name
 
 notice_queue: asyncio.Queue[MessageBase] = asyncio.Queue(maxsize=100)
 unsuccessful_notice_queue: asyncio.Queue[MessageBase] = asyncio.Queue(maxsize=3)
@@ -102,19 +117,16 @@ class NoticeHandler:
             group_info=group_info,
         )
 
-    async def handle_notice(self, raw_message: dict) -> None:
-        # 从 Milky 事件中提取通知数据
-        event_data = raw_message.get("data", {})
-        event_type = raw_message.get("event_type")
-        
+    async def handle_notice(self, event: MilkyEvent) -> None:
+        event_data = event.data
+        event_type = event.event_type
+
         # 根据 Milky 事件类型映射到通知类型
         notice_type = self._map_milky_event_to_notice(event_type, event_data)
-        
+
         message_time: float = time.time()
 
-        group_id = event_data.get("group_id")
-        user_id = event_data.get("user_id") or event_data.get("initiator_id") or event_data.get("sender_id")
-        target_id = event_data.get("target_user_id") or event_data.get("receiver_id")
+        group_id, user_id, target_id = self._get_notice_participants(event)
 
         handled_message: Seg = None
         user_info: UserInfo = None
@@ -123,11 +135,11 @@ class NoticeHandler:
         match notice_type:
             case NoticeType.friend_recall:
                 logger.info("好友撤回一条消息")
-                logger.info(f"撤回消息序列号：{event_data.get('message_seq')}, 撤回时间：{event_data.get('time')}")
+                logger.info(f"撤回消息序列号：{event_data.message_seq}, 撤回时间：{event.time}")
                 logger.warning("暂时不支持撤回消息处理")
             case NoticeType.group_recall:
                 logger.info("群内用户撤回一条消息")
-                logger.info(f"撤回消息序列号：{event_data.get('message_seq')}, 撤回时间：{event_data.get('time')}")
+                logger.info(f"撤回消息序列号：{event_data.message_seq}, 撤回时间：{event.time}")
                 logger.warning("暂时不支持撤回消息处理")
             case NoticeType.notify:
                 sub_type = self._get_notify_sub_type(event_type, event_data)
@@ -137,7 +149,9 @@ class NoticeHandler:
                             user_id, group_id, False, False
                         ):
                             logger.info("处理戳一戳消息")
-                            handled_message, user_info = await self.handle_poke_notify(event_data, group_id, user_id)
+                            handled_message, user_info = await self.handle_poke_notify(
+                                event.self_id, group_id, user_id, target_id
+                            )
                         else:
                             logger.warning("戳一戳消息被禁用，取消戳一戳处理")
                     case _:
@@ -146,13 +160,13 @@ class NoticeHandler:
                 sub_type = self._get_group_ban_sub_type(event_type, event_data)
                 match sub_type:
                     case NoticeType.GroupBan.ban:
-                        if not await message_handler.check_allow_to_chat(user_id, group_id, True, False):
+                        if not await message_handler.check_allow_to_chat(user_id, group_id, True, True):
                             return None
                         logger.info("处理群禁言")
                         handled_message, user_info = await self.handle_ban_notify(event_data, group_id)
                         system_notice = True
                     case NoticeType.GroupBan.lift_ban:
-                        if not await message_handler.check_allow_to_chat(user_id, group_id, True, False):
+                        if not await message_handler.check_allow_to_chat(user_id, group_id, True, True):
                             return None
                         logger.info("处理解除群禁言")
                         handled_message, user_info = await self.handle_lift_ban_notify(event_data, group_id)
@@ -167,9 +181,10 @@ class NoticeHandler:
             return None
 
         group_info: GroupInfo = None
+        group_name: str = ""
         if group_id:
-            # Milky 可能不提供群名称，使用默认值
-            group_name = ""
+            # Milky 通知不携带群名称，从缓存/API 获取
+            group_name = await get_group_name(group_id)
             group_info = GroupInfo(
                 platform=global_config.maibot_server.platform_name,
                 group_id=group_id,
@@ -219,7 +234,7 @@ class NoticeHandler:
         message_base: MessageBase = MessageBase(
             message_info=message_info,
             message_segment=handled_message,
-            raw_message=json.dumps(raw_message),
+            raw_message=event.to_raw_message(),
         )
 
         if system_notice:
@@ -228,11 +243,42 @@ class NoticeHandler:
             logger.info("发送到Maibot处理通知信息")
             await message_send_instance.message_send(message_base)
 
-    def _map_milky_event_to_notice(self, event_type: str, event_data: dict) -> str:
+    def _get_notice_participants(self, event: MilkyEvent) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+        """
+        获取通知涉及的群号、发起者与目标
+        Returns:
+            Tuple[群号, 发起者QQ号, 目标QQ号]，不存在的项为 None
+        """
+        data = event.data
+        match data:
+            case GroupNudgeEvent():
+                return data.group_id, data.sender_id, data.receiver_id
+            case FriendNudgeEvent():
+                # 好友戳一戳只给出对方QQ号，由 is_self_send / is_self_receive 区分方向
+                sender_id = event.self_id if data.is_self_send else data.user_id
+                receiver_id = event.self_id if data.is_self_receive else data.user_id
+                return None, sender_id, receiver_id
+            case GroupMuteEvent():
+                return data.group_id, data.user_id, None
+            case GroupWholeMuteEvent():
+                return data.group_id, data.operator_id, None
+            case MessageRecallEvent():
+                return (data.peer_id if data.message_scene == "group" else None), data.sender_id, None
+            case GroupInvitedJoinRequestEvent():
+                return data.group_id, data.initiator_id, data.target_user_id
+            case GroupJoinRequestEvent() | GroupInvitationEvent():
+                return data.group_id, data.initiator_id, None
+            case FriendRequestEvent():
+                return None, data.initiator_id, None
+            case GroupMemberIncreaseEvent() | GroupMemberDecreaseEvent() | GroupAdminChangeEvent():
+                return data.group_id, data.user_id, None
+        return None, None, None
+
+    def _map_milky_event_to_notice(self, event_type: str, event_data) -> str:
         """将 Milky 事件类型映射到通知类型"""
         if event_type == "message_recall":
             # 判断是群聊还是私聊
-            message_scene = event_data.get("message_scene")
+            message_scene = event_data.message_scene
             if message_scene == "friend":
                 return NoticeType.friend_recall
             elif message_scene == "group":
@@ -245,40 +291,32 @@ class NoticeHandler:
             return NoticeType.notify
         return "unknown"
 
-    def _get_notify_sub_type(self, event_type: str, event_data: dict) -> str:
+    def _get_notify_sub_type(self, event_type: str, event_data) -> str:
         """获取通知子类型"""
         if event_type in ["friend_nudge", "group_nudge"]:
             return NoticeType.Notify.poke
         return "unknown"
 
-    def _get_group_ban_sub_type(self, event_type: str, event_data: dict) -> str:
+    def _get_group_ban_sub_type(self, event_type: str, event_data) -> str:
         """获取群禁言子类型"""
         if event_type == "group_mute":
-            duration = event_data.get("duration", 0)
-            if duration > 0:
+            if event_data.duration > 0:
                 return NoticeType.GroupBan.ban
             else:
                 return NoticeType.GroupBan.lift_ban
         elif event_type == "group_whole_mute":
-            is_mute = event_data.get("is_mute", False)
-            if is_mute:
+            if event_data.is_mute:
                 return NoticeType.GroupBan.ban
             else:
                 return NoticeType.GroupBan.lift_ban
         return "unknown"
 
     async def handle_poke_notify(
-        self, event_data: dict, group_id: int, user_id: int
+        self, self_id: int, group_id: Optional[int], user_id: int, target_id: int
     ) -> Tuple[Seg | None, UserInfo | None]:
         # sourcery skip: merge-comparisons, merge-duplicate-blocks, remove-redundant-if, remove-unnecessary-else, swap-if-else-branches
-        
-        # Milky 可能不提供机器人信息，使用默认值
-        self_id = event_data.get("self_id", 0)
-        target_id = event_data.get("receiver_id") or event_data.get("user_id")
-        
-        # 获取用户信息 - 修复不存在的sender字段
-        # 从sender_id获取用户ID，然后调用API获取详细信息
-        user_id = event_data.get("sender_id") or event_data.get("user_id")
+
+        # 获取用户信息，调用API获取详细信息
         user_name = f"用户{user_id}" if user_id else "未知用户"
         user_cardname = f"用户{user_id}" if user_id else "未知用户"
         
@@ -288,9 +326,10 @@ class NoticeHandler:
                 member_info_result = await get_member_info(group_id, user_id)
                 if member_info_result.get("status") == "ok":
                     member_data = member_info_result.get("data", {})
+                    member_data = member_data.get("member", member_data)
                     user_name = member_data.get("nickname", f"用户{user_id}")
                     user_cardname = member_data.get("card", f"用户{user_id}")
-                    logger.debug(f"通过API获取到群成员信息: nickname={user_name}, card={user_cardname}")
+                    logger.debug("通过API获取到群成员信息: nickname={}, card={}", user_name, user_cardname)
             except Exception as e:
                 logger.error(f"调用API获取用户信息时发生错误: {e}")
                 user_name = f"用户{user_id}" if user_id else "未知用户"
@@ -327,13 +366,15 @@ class NoticeHandler:
         )
         return seg_data, user_info
 
-    async def handle_ban_notify(self, event_data: dict, group_id: int) -> Tuple[Seg, UserInfo] | Tuple[None, None]:
+    async def handle_ban_notify(
+        self, event_data: GroupMuteEvent | GroupWholeMuteEvent, group_id: int
+    ) -> Tuple[Seg, UserInfo] | Tuple[None, None]:
         if not group_id:
             logger.error("群ID不能为空，无法处理禁言通知")
             return None, None
 
         # 计算user_info
-        operator_id = event_data.get("operator_id")
+        operator_id = event_data.operator_id
         operator_nickname: str = f"用户{operator_id}" if operator_id else "未知操作者"
         operator_cardname: str = None
 
@@ -344,18 +385,16 @@ class NoticeHandler:
             user_cardname=operator_cardname,
         )
 
-        # 计算Seg
-        user_id = event_data.get("user_id")
+        # 计算Seg，全体禁言没有被禁言者与时长
+        if isinstance(event_data, GroupWholeMuteEvent):
+            user_id, duration = 0, -1
+        else:
+            user_id, duration = event_data.user_id, event_data.duration
         banned_user_info: UserInfo = None
         user_nickname: str = f"用户{user_id}" if user_id else "未知用户"
         user_cardname: str = None
         sub_type: str = None
 
-        duration = event_data.get("duration")
-        if duration is None:
-            logger.error("禁言时长不能为空，无法处理禁言通知")
-            return None, None
-
         if user_id == 0:  # 为全体禁言
             sub_type: str = "whole_ban"
             self._ban_operation(group_id)
@@ -382,14 +421,14 @@ class NoticeHandler:
         return seg_data, operator_info
 
     async def handle_lift_ban_notify(
-        self, event_data: dict, group_id: int
+        self, event_data: GroupMuteEvent | GroupWholeMuteEvent, group_id: int
     ) -> Tuple[Seg, UserInfo] | Tuple[None, None]:
         if not group_id:
             logger.error("群ID不能为空，无法处理解除禁言通知")
             return None, None
 
         # 计算user_info
-        operator_id = event_data.get("operator_id")
+        operator_id = event_data.operator_id
         operator_nickname: str = f"用户{operator_id}" if operator_id else "未知操作者"
         operator_cardname: str = None
 
@@ -402,11 +441,11 @@ class NoticeHandler:
 
         # 计算Seg
         sub_type: str = None
+        user_id = 0 if isinstance(event_data, GroupWholeMuteEvent) else event_data.user_id
         user_nickname: str = f"用户{user_id}" if user_id else "未知用户"
         user_cardname: str = None
         lifted_user_info: UserInfo = None
 
-        user_id = event_data.get("user_id")
         if user_id == 0:  # 全体禁言解除
             sub_type = "whole_lift_ban"
             self._lift_operation(group_id)
@@ -477,8 +516,8 @@ class NoticeHandler:
 
                 seg_message: Seg = await self.natural_lift(group_id, user_id)
 
-                # Milky 可能不提供群名称，使用默认值
-                group_name = ""
+                # Milky 通知不携带群名称，从缓存/API 获取
+                group_name = await get_group_name(group_id)
                 group_info = GroupInfo(
                     platform=global_config.maibot_server.platform_name,
                     group_id=group_id,
@@ -509,7 +548,7 @@ class NoticeHandler:
                 message_base: MessageBase = MessageBase(
                     message_info=message_info,
                     message_segment=seg_message,
-                    raw_message=json.dumps(
+                    raw_message=json_codec.dumps(
                         {
                             "post_type": "notice",
                             "notice_type": "group_ban",
@@ -1,44 +1,110 @@
 import asyncio
 import time
-from typing import Dict
-from .config import global_config
+from collections import OrderedDict
+from typing import Dict, Tuple
+
 from .logger import logger
+from .stats import register_stats_provider
 
-response_dict: Dict = {}
-response_time_dict: Dict = {}
+MAX_PENDING_REQUESTS: int = 1024
+"""同时等待响应的请求数上限"""
 
+MAX_UNCLAIMED_RESPONSES: int = 256
+"""暂存的未被认领响应数上限"""
 
-async def get_response(request_id: str, timeout: int = 10) -> dict:
-    response = await asyncio.wait_for(_get_response(request_id), timeout)
-    _ = response_time_dict.pop(request_id)
-    logger.trace(f"响应信息id: {request_id} 已从响应字典中取出")
-    return response
+UNCLAIMED_RESPONSE_TTL: int = 30
+"""未被认领响应的保留时间（秒）"""
+
+response_waiters: Dict[str, asyncio.Future] = {}
+unclaimed_responses: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+response_stats: Dict[str, int] = {
+    "hits": 0,
+    "early_hits": 0,
+    "timeouts": 0,
+    "cancelled": 0,
+    "orphans": 0,
+    "rejected": 0,
+}
 
-async def _get_response(request_id: str) -> dict:
+
+async def get_response(request_id: str, timeout: int = 10) -> dict:
     """
-    内部使用的获取响应函数，主要用于在需要时获取响应
+    等待指定 echo id 的响应
+    Parameters:
+        request_id: str: 请求的 echo id
+        timeout: int: 本次请求的等待期限（秒）
+    Returns:
+        dict: 响应内容，超时将抛出 asyncio.TimeoutError
     """
-    while request_id not in response_dict:
-        await asyncio.sleep(0.2)
-    return response_dict.pop(request_id)
+    # 响应可能先于等待者到达
+    if request_id in unclaimed_responses:
+        _, response = unclaimed_responses.pop(request_id)
+        response_stats["early_hits"] += 1
+        logger.trace("响应信息id: {} 已从暂存区取出", request_id)
+        return response
+
+    if request_id in response_waiters:
+        raise RuntimeError(f"响应信息id: {request_id} 已有等待者")
+    if len(response_waiters) >= MAX_PENDING_REQUESTS:
+        response_stats["rejected"] += 1
+        raise RuntimeError(f"等待响应的请求过多（上限 {MAX_PENDING_REQUESTS}）")
+
+    future: asyncio.Future = asyncio.get_running_loop().create_future()
+    response_waiters[request_id] = future
+    try:
+        response = await asyncio.wait_for(future, timeout)
+        logger.trace("响应信息id: {} 已送达等待者", request_id)
+        return response
+    except asyncio.TimeoutError:
+        response_stats["timeouts"] += 1
+        logger.warning(f"等待响应 {request_id} 超时")
+        raise
+    except asyncio.CancelledError:
+        response_stats["cancelled"] += 1
+        raise
+    finally:
+        # 无论成功、超时还是被取消，都要移除等待者，避免泄漏
+        response_waiters.pop(request_id, None)
+
 
 async def put_response(response: dict):
     echo_id = response.get("echo")
-    now_time = time.time()
-    response_dict[echo_id] = response
-    response_time_dict[echo_id] = now_time
-    logger.trace(f"响应信息id: {echo_id} 已存入响应字典")
+    future = response_waiters.get(echo_id)
+    if future is not None and not future.done():
+        future.set_result(response)
+        response_stats["hits"] += 1
+        return
+    # 暂无等待者，暂存一段时间，超出上限时丢弃最旧的
+    unclaimed_responses[echo_id] = (time.time(), response)
+    unclaimed_responses.move_to_end(echo_id)
+    while len(unclaimed_responses) > MAX_UNCLAIMED_RESPONSES:
+        dropped_id, _ = unclaimed_responses.popitem(last=False)
+        response_stats["orphans"] += 1
+        logger.warning(f"响应暂存区已满，丢弃响应 {dropped_id}")
+    logger.trace("响应信息id: {} 已存入暂存区", echo_id)
 
 
 async def check_timeout_response() -> None:
     while True:
         cleaned_message_count: int = 0
         now_time = time.time()
-        for echo_id, response_time in list(response_time_dict.items()):
-            if now_time - response_time > global_config.milky_server.heartbeat_interval:
+        for echo_id, (response_time, _) in list(unclaimed_responses.items()):
+            if now_time - response_time > UNCLAIMED_RESPONSE_TTL:
                 cleaned_message_count += 1
-                response_dict.pop(echo_id)
-                response_time_dict.pop(echo_id)
-                logger.warning(f"响应消息 {echo_id} 超时，已删除")
-        logger.info(f"已删除 {cleaned_message_count} 条超时响应消息")
-        await asyncio.sleep(global_config.milky_server.heartbeat_interval)
+                unclaimed_responses.pop(echo_id, None)
+                response_stats["orphans"] += 1
+                logger.warning(f"响应消息 {echo_id} 无人认领，已删除")
+        if cleaned_message_count:
+            logger.info(f"已删除 {cleaned_message_count} 条超时响应消息")
+        await asyncio.sleep(UNCLAIMED_RESPONSE_TTL)
+
+
+def get_response_stats() -> dict:
+    return {
+        **response_stats,
+        "pending": len(response_waiters),
+        "unclaimed": len(unclaimed_responses),
+    }
+
+
+register_stats_provider("response_pool", get_response_stats)
@@ -7,12 +7,17 @@ from maim_message import (
     BaseMessageInfo,
     MessageBase,
 )
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 
 from . import CommandType
 from .config import global_config
 from .logger import logger
-from .utils import get_image_format, convert_image_to_gif
+from .image_ops import convert_image_to_gif
+from .media_inspector import inspect_base64
+from .image_pool import image_pool
+from .gif_cache import gif_cache
+from .media_spool import media_spool, SpoolLease
+from .media_budget import media_budget, MediaLedger
 from .recv_handler.message_sending import message_send_instance
 from .milky_com_layer import milky_com
 
@@ -35,17 +40,30 @@ class SendHandler:
         处理普通消息发送
         """
         logger.info("处理普通信息中")
-        message_info: BaseMessageInfo = raw_message_base.message_info
         message_segment: Seg = raw_message_base.message_segment
+        processed_message: list = []
+        # 本次发送中写入中转目录的文件和占用的媒体内存，发送完成后统一释放
+        spool_lease = media_spool.lease()
+        media_ledger = media_budget.ledger()
+        try:
+            try:
+                processed_message = await self.handle_seg_recursive(message_segment, spool_lease, media_ledger)
+            except Exception as e:
+                logger.error(f"处理消息时发生错误: {e}")
+                return
+            await self.send_processed_message(raw_message_base, processed_message)
+        finally:
+            media_ledger.release()
+            await spool_lease.release()
+
+    async def send_processed_message(self, raw_message_base: MessageBase, processed_message: list) -> None:
+        """
+        将处理好的消息段发送到 Milky
+        """
+        message_info: BaseMessageInfo = raw_message_base.message_info
         group_info: GroupInfo = message_info.group_info
         user_info: UserInfo = message_info.user_info
         target_id: int = None
-        processed_message: list = []
-        try:
-            processed_message = await self.handle_seg_recursive(message_segment)
-        except Exception as e:
-            logger.error(f"处理消息时发生错误: {e}")
-            return
 
         if not processed_message:
             logger.critical("现在暂时不支持解析此回复！")
@@ -118,19 +136,27 @@ class SendHandler:
         else:
             return 1
 
-    async def handle_seg_recursive(self, seg_data: Seg) -> list:
+    async def handle_seg_recursive(
+        self, seg_data: Seg, spool_lease: Optional[SpoolLease] = None, media_ledger: Optional[MediaLedger] = None
+    ) -> list:
         payload: list = []
         if seg_data.type == "seglist":
             # level = self.get_level(seg_data)  # 给以后可能的多层嵌套做准备，此处不使用
             if not seg_data.data:
                 return []
             for seg in seg_data.data:
-                payload = self.process_message_by_type(seg, payload)
+                payload = await self.process_message_by_type(seg, payload, spool_lease, media_ledger)
         else:
-            payload = self.process_message_by_type(seg_data, payload)
+            payload = await self.process_message_by_type(seg_data, payload, spool_lease, media_ledger)
         return payload
 
-    def process_message_by_type(self, seg: Seg, payload: list) -> list:
+    async def process_message_by_type(
+        self,
+        seg: Seg,
+        payload: list,
+        spool_lease: Optional[SpoolLease] = None,
+        media_ledger: Optional[MediaLedger] = None,
+    ) -> list:
         # sourcery skip: reintroduce-else, swap-if-else-branches, use-named-expression
         new_payload = payload
         if seg.type == "reply":
@@ -147,13 +173,13 @@ class SendHandler:
             logger.warning("MaiBot 发送了qq原生表情，暂时不支持")
         elif seg.type == "image":
             image = seg.data
-            new_payload = self.build_payload(payload, self.handle_image_message(image), False)
+            new_payload = self.build_payload(payload, await self.handle_image_message(image, spool_lease, media_ledger), False)
         elif seg.type == "emoji":
             emoji = seg.data
-            new_payload = self.build_payload(payload, self.handle_emoji_message(emoji), False)
+            new_payload = self.build_payload(payload, await self.handle_emoji_message(emoji, spool_lease, media_ledger), False)
         elif seg.type == "voice":
             voice = seg.data
-            new_payload = self.build_payload(payload, self.handle_voice_message(voice), False)
+            new_payload = self.build_payload(payload, await self.handle_voice_message(voice, spool_lease, media_ledger), False)
         elif seg.type == "voiceurl":
             voice_url = seg.data
             new_payload = self.build_payload(payload, self.handle_voiceurl_message(voice_url), False)
@@ -195,32 +221,88 @@ class SendHandler:
         """处理文本消息"""
         return {"type": "text", "data": {"text": message}}
 
-    def handle_image_message(self, encoded_image: str) -> dict:
+    async def media_file_uri(
+        self,
+        encoded: str,
+        spool_lease: Optional[SpoolLease],
+        suffix: str = "",
+        media_ledger: Optional[MediaLedger] = None,
+    ) -> str:
+        """
+        生成媒体的 file 字段，超过阈值时写入中转目录并使用 file:// URI，否则内联 Base64
+        媒体内存预算已满时忽略阈值直接写入中转目录，未启用中转时等待预算空余
+        Parameters:
+            encoded: str: Base64编码的媒体数据
+            spool_lease: SpoolLease | None: 本次发送的中转文件租约
+            suffix: str: 中转文件后缀
+            media_ledger: MediaLedger | None: 本次发送的媒体内存记账
+        Returns:
+            str: file 字段的值
+        """
+        if spool_lease is not None:
+            over_budget = not media_budget.has_room(len(encoded))
+            try:
+                uri = await spool_lease.spool_base64(encoded, suffix, force=over_budget)
+                if uri:
+                    if over_budget:
+                        media_budget.record_spill()
+                    return uri
+            except Exception as e:
+                logger.warning(f"写入中转文件失败，改为内联发送: {e}")
+        if media_ledger is not None:
+            await media_ledger.reserve(len(encoded))
+        return f"base64://{encoded}"
+
+    def image_suffix(self, encoded_image: str) -> str:
+        image_format = inspect_base64(encoded_image).format
+        return f".{image_format}" if image_format else ""
+
+    async def handle_image_message(
+        self, encoded_image: str, spool_lease: Optional[SpoolLease] = None, media_ledger: Optional[MediaLedger] = None
+    ) -> dict:
         """处理图片消息"""
         return {
             "type": "image",
             "data": {
-                "file": f"base64://{encoded_image}",
+                "file": await self.media_file_uri(
+                    encoded_image, spool_lease, self.image_suffix(encoded_image), media_ledger
+                ),
                 "subtype": 0,
             },
         }  # base64 编码的图片
 
-    def handle_emoji_message(self, encoded_emoji: str) -> dict:
+    async def handle_emoji_message(
+        self, encoded_emoji: str, spool_lease: Optional[SpoolLease] = None, media_ledger: Optional[MediaLedger] = None
+    ) -> dict:
         """处理表情消息"""
-        encoded_image = encoded_emoji
-        image_format = get_image_format(encoded_emoji)
-        if image_format != "gif":
-            encoded_image = convert_image_to_gif(encoded_emoji)
+        try:
+            encoded_image = await gif_cache.get_or_convert(encoded_emoji, self.convert_emoji_to_gif)
+        except Exception as e:
+            logger.error(f"图片转换为GIF失败: {str(e)}")
+            encoded_image = encoded_emoji
         return {
             "type": "image",
             "data": {
-                "file": f"base64://{encoded_image}",
+                "file": await self.media_file_uri(
+                    encoded_image, spool_lease, self.image_suffix(encoded_image), media_ledger
+                ),
                 "subtype": 1,
                 "summary": "[动画表情]",
             },
         }
 
-    def handle_voice_message(self, encoded_voice: str) -> dict:
+    async def convert_emoji_to_gif(self, encoded_emoji: str) -> str:
+        """在图片处理池中将非GIF表情转换为GIF"""
+        # 只解码文件头判断格式，GIF 无需转换，其余格式只在转换时完整解码一次
+        media_info = inspect_base64(encoded_emoji)
+        if media_info.format == "gif":
+            return encoded_emoji
+        logger.debug("转换图片为GIF格式")
+        return await image_pool.run(convert_image_to_gif, encoded_emoji)
+
+    async def handle_voice_message(
+        self, encoded_voice: str, spool_lease: Optional[SpoolLease] = None, media_ledger: Optional[MediaLedger] = None
+    ) -> dict:
         """处理语音消息"""
         if not global_config.voice.use_tts:
             logger.warning("未启用语音消息处理")
@@ -229,7 +311,7 @@ class SendHandler:
             return {}
         return {
             "type": "record",
-            "data": {"file": f"base64://{encoded_voice}"},
+            "data": {"file": await self.media_file_uri(encoded_voice, spool_lease, media_ledger=media_ledger)},
         }
 
     def handle_voiceurl_message(self, voice_url: str) -> dict:
@@ -0,0 +1,70 @@
+"""
+运行指标汇总模块
+各组件通过 register_stats_provider 注册自己的指标函数，由 stats_report_loop 定期输出
+"""
+
+import asyncio
+from bisect import bisect_left
+from typing import Callable, Dict, Any, Sequence
+
+from .logger import logger, rate_limiter
+
+_stats_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_stats_provider(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """注册指标提供函数，同名提供者会被覆盖"""
+    _stats_providers[name] = provider
+
+
+class Histogram:
+    """固定分桶的简单直方图"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets: tuple = tuple(sorted(buckets))
+        self.counts: list[int] = [0] * (len(self.buckets) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        distribution = {f"<={bound:g}": n for bound, n in zip(self.buckets, self.counts) if n}
+        if self.counts[-1]:
+            distribution[f">{self.buckets[-1]:g}"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0,
+            "max": round(self.max, 3),
+            "distribution": distribution,
+        }
+
+
+def collect_stats() -> Dict[str, Dict[str, Any]]:
+    """收集所有已注册组件的当前指标"""
+    result: Dict[str, Dict[str, Any]] = {}
+    for name, provider in _stats_providers.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            logger.error(f"收集指标 {name} 时发生错误: {e}")
+    return result
+
+
+register_stats_provider("logging", rate_limiter.get_stats)
+
+
+async def stats_report_loop(interval: int) -> None:
+    """定期输出运行指标，interval 为 0 时不输出"""
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        for name, stats in collect_stats().items():
+            logger.info(f"[指标] {name}: {stats}")
@@ -1,17 +1,19 @@
-import base64
-import requests
-import certifi
-import base64
 import urllib3
 import ssl
-import io
+import time
 
 from src.database import BanUser, db_manager
 from .logger import logger
+from .log_format import redacted
 from .milky_com_layer import milky_com
+from .directory_cache import directory_cache
+from .media_downloader import media_downloader
 
-from PIL import Image
 from typing import Union, List, Tuple, Optional
+from urllib.parse import urlsplit, parse_qsl
+
+# 常见的 URL 过期时间戳参数
+URL_EXPIRE_QUERY_KEYS = ("e", "expire", "expires", "x-expires", "x-oss-expires")
 
 
 class SSLAdapter(urllib3.PoolManager):
@@ -30,12 +32,30 @@ async def get_group_info(group_id: int) -> dict | None:
     返回值需要处理可能为空的情况
     """
     logger.debug("获取群聊信息中")
-    result = await milky_com.get_group_info(group_id)
+    result = await directory_cache.get_or_fetch("group", group_id, lambda: milky_com.get_group_info(group_id))
     if result:
-        logger.debug(f"群信息获取成功: {result}")
+        logger.debug("群信息获取成功: {}", redacted(result))
     return result
 
 
+async def get_group_name(group_id: int) -> str:
+    """
+    获取群名称，获取失败时返回空字符串
+    """
+    if not group_id:
+        return ""
+    try:
+        result = await get_group_info(group_id)
+    except Exception as e:
+        logger.error(f"获取群名称时发生错误: {e}")
+        return ""
+    if not result or result.get("status") != "ok":
+        return ""
+    group_data: dict = result.get("data") or {}
+    group_data = group_data.get("group", group_data)
+    return group_data.get("group_name") or group_data.get("name") or ""
+
+
 async def get_group_detail_info(group_id: int) -> dict | None:
     """
     获取群详细信息
@@ -44,9 +64,9 @@ async def get_group_detail_info(group_id: int) -> dict | None:
     """
     logger.debug("获取群详细信息中")
     # Milky 可能没有单独的详细群信息 API，暂时使用普通群信息
-    result = await milky_com.get_group_info(group_id)
+    result = await directory_cache.get_or_fetch("group", group_id, lambda: milky_com.get_group_info(group_id))
     if result:
-        logger.debug(f"群详细信息获取成功: {result}")
+        logger.debug("群详细信息获取成功: {}", redacted(result))
     return result
 
 
@@ -57,44 +77,38 @@ async def get_member_info(group_id: int, user_id: int) -> dict | None:
     返回值需要处理可能为空的情况
     """
     logger.debug("获取群成员信息中")
-    result = await milky_com.get_group_member_info(group_id, user_id)
+    result = await directory_cache.get_or_fetch(
+        "member", (group_id, user_id), lambda: milky_com.get_group_member_info(group_id, user_id)
+    )
     if result:
-        logger.debug(f"群成员信息获取成功: {result}")
+        logger.debug("群成员信息获取成功: {}", redacted(result))
     return result
 
 
 async def get_image_base64(url: str) -> str:
     """获取图片/表情包的Base64"""
-    logger.debug(f"下载图片: {url}")
+    logger.debug("下载图片: {}", redacted(url))
     try:
-        response = requests.get(url, timeout=10, verify=certifi.where())
-        response.raise_for_status()  # 如果不是200会抛异常
-        return base64.b64encode(response.content).decode("utf-8")
+        return await media_downloader.fetch_base64(url)
     except Exception as e:
         logger.error(f"图片下载失败: {str(e)}")
         raise
 
 
-def convert_image_to_gif(image_base64: str) -> str:
-    # sourcery skip: extract-method
+def url_expires_within(url: str, seconds: int) -> bool:
     """
-    将Base64编码的图片转换为GIF格式
+    判断URL是否会在指定时间内过期
+    只能识别查询参数中带有 Unix 时间戳的URL，无法判断时视为不会过期
     Parameters:
-        image_base64: str: Base64编码的图片数据
+        url: str: 链接
+        seconds: int: 时间范围（秒）
     Returns:
-        str: Base64编码的GIF图片数据
+        bool: 是否即将过期
     """
-    logger.debug("转换图片为GIF格式")
-    try:
-        image_bytes = base64.b64decode(image_base64)
-        image = Image.open(io.BytesIO(image_bytes))
-        output_buffer = io.BytesIO()
-        image.save(output_buffer, format="GIF")
-        output_buffer.seek(0)
-        return base64.b64encode(output_buffer.read()).decode("utf-8")
-    except Exception as e:
-        logger.error(f"图片转换为GIF失败: {str(e)}")
-        return image_base64
+    for key, value in parse_qsl(urlsplit(url).query):
+        if key.lower() in URL_EXPIRE_QUERY_KEYS and value.isdigit():
+            return int(value) - time.time() < seconds
+    return False
 
 
 async def get_self_info() -> dict | None:
@@ -106,7 +120,7 @@ async def get_self_info() -> dict | None:
     logger.debug("获取自身信息中")
     result = await milky_com.get_login_info()
     if result:
-        logger.debug(f"自身信息获取成功: {result}")
+        logger.debug("自身信息获取成功: {}", redacted(result))
     return result
 
 
@@ -117,23 +131,12 @@ async def get_user_profile(user_id: int) -> dict | None:
     返回值需要处理可能为空的情况
     """
     logger.debug("获取用户信息中")
-    result = await milky_com.get_user_profile(user_id)
+    result = await directory_cache.get_or_fetch("profile", user_id, lambda: milky_com.get_user_profile(user_id))
     if result:
-        logger.debug(f"用户信息获取成功: {result}")
+        logger.debug("用户信息获取成功: {}", redacted(result))
     return result
 
 
-def get_image_format(raw_data: str) -> str:
-    """
-    从Base64编码的数据中确定图片的格式。
-    Parameters:
-        raw_data: str: Base64编码的图片数据。
-    Returns:
-        format: str: 图片的格式（例如 'jpeg', 'png', 'gif'）。
-    """
-    image_bytes = base64.b64decode(raw_data)
-    return Image.open(io.BytesIO(image_bytes)).format.lower()
-
 async def get_message_detail(message_seq: Union[str, int]) -> dict | None:
     """
     获取消息详情，可能为空
@@ -152,7 +155,7 @@ async def get_message_detail(message_seq: Union[str, int]) -> dict | None:
     }
     result = await milky_com.get_message("group", 0, message_seq)
     if result:
-        logger.debug(f"消息详情获取成功: {result}")
+        logger.debug("消息详情获取成功: {}", redacted(result))
     return result
 
 
@@ -168,7 +171,7 @@ async def get_record_detail(file: str, file_id: Optional[str] = None) -> dict |
     logger.debug("获取语音消息详情中")
     result = await milky_com.get_record(file, file_id)
     if result:
-        logger.debug(f"语音消息详情获取成功: {str(result)[:200]}...")  # 防止语音的超长base64编码导致日志过长
+        logger.debug("语音消息详情获取成功: {}", redacted(result))
     return result
 
 